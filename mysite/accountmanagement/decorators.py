@@ -1,9 +1,10 @@
-import json,jwt,os
+import jwt,os
 from django.http import HttpResponse
 from rest_framework import status
 from notes import utils
 from services.cache import Cache
 from services.encrypt import Encrypt
+from services.renderers import dumps
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,25 +28,24 @@ def user_login_required(view_func):
         try:
             token = request.META['HTTP_AUTHORIZATION']
             decoded_token = Encrypt.decode(token)
-            if Cache.getInstance().get("TOKEN_"+str(decoded_token['id'])+"_AUTH").decode("utf-8") == token:
+            stored_token = Cache.getInstance().get("TOKEN_"+str(decoded_token['id'])+"_AUTH")
+            if isinstance(stored_token, bytes):                 # token cached before values were encoded
+                stored_token = stored_token.decode("utf-8")
+            if stored_token == token:
                 kwargs['userid'] = decoded_token['id']
                 return view_func(request, *args , **kwargs)
             else:
                 result = utils.manage_response(status=False,message='User must be logged in',log='User id not found',logger_obj=logger)
-                HttpResponse.status_code = status.HTTP_401_UNAUTHORIZED
-                return HttpResponse(json.dumps(result),HttpResponse.status_code)
+                return HttpResponse(dumps(result),content_type='application/json',status=status.HTTP_401_UNAUTHORIZED)
         except jwt.ExpiredSignatureError as e:
             result = utils.manage_response(status=False,message='Activation has expired.Please generate a new token',log=str(e),logger_obj=logger)
-            HttpResponse.status_code = status.HTTP_401_UNAUTHORIZED
-            return HttpResponse(json.dumps(result), HttpResponse.status_code)
+            return HttpResponse(dumps(result),content_type='application/json',status=status.HTTP_401_UNAUTHORIZED)
         except jwt.exceptions.DecodeError as e:
             result = utils.manage_response(status=False,message='Please provide a valid token',log=str(e),logger_obj=logger)
-            HttpResponse.status_code = status.HTTP_400_BAD_REQUEST
-            return HttpResponse(json.dumps(result), HttpResponse.status_code)
+            return HttpResponse(dumps(result),content_type='application/json',status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             result = utils.manage_response(status=False,message='Something went wrong.Please try again.',log=str(e),logger_obj=logger)
-            HttpResponse.status_code = status.HTTP_400_BAD_REQUEST
-            return HttpResponse(json.dumps(result), HttpResponse.status_code)
+            return HttpResponse(dumps(result),content_type='application/json',status=status.HTTP_400_BAD_REQUEST)
 
     return wrapper
 
@@ -2,9 +2,11 @@ import logging,os
 from celery import shared_task
 from django.core.mail import EmailMessage
 import threading
+from django.utils import timezone
+from notes.batch import purge_notes
 from notes.models import Note
-from accountmanagement.models import Account
-from mysite.settings import SECONDS_IN_DAY,MINUTE_CONVERSION_CONSTANT,MINUTES_IN_HOUR
+from notes.warmup import warm_user_cache as warm_note_cache
+from mysite.settings import CACHE_WARMUP_QUERY_BUDGET, MINUTES_IN_HOUR, PURGE_BATCH_SIZE, TRASH_RETENTION_DAYS
 import datetime
 import pytz
 
@@ -50,29 +52,53 @@ def check_reminder():
     current_time = utc.localize(current_time)
     logger.debug(current_time)
 
-    for note in Note.objects.exclude(reminder=None).filter(reminder__gt = current_time):
-        difference = note.reminder-current_time
-        minutes_remaining = (divmod(difference.days * SECONDS_IN_DAY + difference.seconds, MINUTE_CONVERSION_CONSTANT))
-
-        if(minutes_remaining[0] < MINUTES_IN_HOUR):
-            user_email = Account.objects.get(email=note.user).email
-            data = {'email_body': 'Hi!Reminder for ' + note.title + ' is scheduled within this hour.',
-                    'to_email': user_email,
-                    'email_subject': 'Reminder for your note'}
-            send_email.delay(data)
-            logger.debug('sent reminder for '+note.title)
-
-
-
-
-
-
-
-
-
-
+    hour_end = current_time + datetime.timedelta(minutes=MINUTES_IN_HOUR)
 
+    for note in Note.objects.with_reminder_between(current_time, hour_end).filter(user__isnull=False).select_related('user'):
+        data = {'email_body': 'Hi!Reminder for ' + note.title + ' is scheduled within this hour.',
+                'to_email': note.user.email,
+                'email_subject': 'Reminder for your note'}
+        send_email.delay(data)
+        logger.debug('sent reminder for '+note.title)
 
 
+@shared_task
+def purge_trashed_notes():
+    """[hard deletes notes trashed for longer than TRASH_RETENTION_DAYS along with their images.
+        Walks trashed notes in ascending id ranges of PURGE_BATCH_SIZE, each purged in its own short transaction]
 
+    :return: number of purged notes
+    """
+    trashed_before = timezone.now() - datetime.timedelta(days=TRASH_RETENTION_DAYS)
+    storage = Note._meta.get_field('image').storage
+    last_id = 0
+    purged_count = 0
+    while True:
+        note_ids = list(Note.objects.trashed().filter(id__gt=last_id, updated_at__lt=trashed_before).order_by(
+            'id').values_list('id', flat=True)[:PURGE_BATCH_SIZE])
+        if not note_ids:
+            break
+        last_id = note_ids[-1]
+        purged = purge_notes(note_ids, trashed_before)
+        for note_id, image in purged:
+            if image:
+                try:
+                    storage.delete(image)
+                except OSError as e:
+                    logger.error('could not delete image {} of purged note {}: {}'.format(image, note_id, e))
+        purged_count += len(purged)
+    logger.debug('purged {} notes trashed before {}'.format(purged_count, trashed_before))
+    return purged_count
+
+
+@shared_task(ignore_result=True)
+def warm_user_cache(user_id):
+    """[caches label map, first page of notes and pinned notes of a user who just logged in,
+        making at most CACHE_WARMUP_QUERY_BUDGET queries]
+
+    :return: number of queries made
+    """
+    queries = warm_note_cache(user_id, CACHE_WARMUP_QUERY_BUDGET)
+    logger.debug('warmed cache of user {} with {} queries'.format(user_id, queries))
+    return queries
 
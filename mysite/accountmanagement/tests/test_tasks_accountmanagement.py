@@ -0,0 +1,50 @@
+import datetime
+import pytest
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from mixer.backend.django import mixer
+from accountmanagement import tasks
+from notes.models import Note
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return Note._meta.get_field('image').storage
+
+
+def trashed_note(owner, storage, days, image=None):
+    note = mixer.blend('notes.Note', user=owner, is_trashed=True, image=None)
+    if image:
+        note.image = storage.save('note_images/' + image, ContentFile(b'image'))
+        note.save()
+    Note.objects.filter(id=note.id).update(updated_at=timezone.now() - datetime.timedelta(days=days))
+    return note
+
+
+class TestPurgeTrashedNotes:
+    def test_expired_notes_and_images_are_purged_in_batches(self, storage, monkeypatch):
+        monkeypatch.setattr(tasks, 'PURGE_BATCH_SIZE', 2)
+        owner = mixer.blend('accountmanagement.Account')
+        expired = [trashed_note(owner, storage, tasks.TRASH_RETENTION_DAYS + 1, image='{}.png'.format(index))
+                   for index in range(3)]
+        recent = trashed_note(owner, storage, 1, image='recent.png')
+        active = mixer.blend('notes.Note', user=owner, is_trashed=False, image=None)
+
+        assert tasks.purge_trashed_notes() == 3
+        assert list(Note.objects.filter(user=owner).order_by('id')) == [recent, active]
+        assert not any(storage.exists(note.image.name) for note in expired)
+        assert storage.exists(recent.image.name)
+
+    def test_image_that_cannot_be_deleted_does_not_stop_purge(self, storage, monkeypatch, caplog):
+        owner = mixer.blend('accountmanagement.Account')
+        expired = trashed_note(owner, storage, tasks.TRASH_RETENTION_DAYS + 1, image='locked.png')
+
+        def fail(name):
+            raise OSError('permission denied')
+        monkeypatch.setattr(storage, 'delete', fail)
+
+        assert tasks.purge_trashed_notes() == 1
+        assert not Note.objects.filter(id=expired.id).exists()
+        assert 'could not delete image {}'.format(expired.image.name) in caplog.text
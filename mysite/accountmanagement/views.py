@@ -8,7 +8,7 @@ import os,jwt,logging
 from django.utils.decorators import method_decorator
 from decouple import config
 from .decorators import user_login_required
-from .tasks import send_email
+from .tasks import send_email, warm_user_cache
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.http import HttpResponsePermanentRedirect, HttpResponse
 from django.urls import reverse
@@ -66,6 +66,11 @@ class Login(generics.GenericAPIView):
             current_time = datetime.datetime.now().strftime("%m/%d/%Y, %H:%M:%S")
             token = Encrypt.encode(user.id,current_time)
             cache.set("TOKEN_"+str(user.id)+"_AUTH", token)
+            if settings.CACHE_WARMUP_ENABLED:
+                try:
+                    warm_user_cache.delay(user.id)
+                except Exception as e:
+                    logger.error('could not enqueue cache warm-up of user {}: {}'.format(user.id, e))
             result = utils.manage_response(status=True, message='Token generated', log='successfully logged in', logger_obj=logger)
             response = Response(result, status=status.HTTP_200_OK,content_type="application/json")
             response.__setitem__(header="HTTP_AUTHORIZATION",value=token)
@@ -94,8 +99,7 @@ class Logout(generics.GenericAPIView):
         """
         try:
             current_user = kwargs['userid']
-            if cache.get("TOKEN_" + str(current_user) + "_AUTH"):
-                cache.delete("TOKEN_" + str(current_user) + "_AUTH")
+            cache.delete("TOKEN_" + str(current_user) + "_AUTH")
 
             result = utils.manage_response(status=True ,message = 'Logged out',log = 'successfully logged out' , logger_obj = logger)
             return Response(result,status=status.HTTP_200_OK,content_type="application/json")
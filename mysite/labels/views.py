@@ -16,7 +16,7 @@ from rest_framework.views import APIView
 from rest_framework import status
 from .serializers import LabelSerializer
 from .models import Label
-from notes import utils
+from notes import generations, utils
 from exceptions.exceptions import CustomError,ExceptionType
 
 
@@ -49,6 +49,7 @@ class ManageLabel(APIView):
         """
         try:
             current_user = kwargs['userid']
+            etag = None
 
             if kwargs.get('pk'):
                 if not Label.objects.filter(id=kwargs.get('pk')).exists():
@@ -58,12 +59,19 @@ class ManageLabel(APIView):
                 serializer = LabelSerializer(label)
 
             else:
+                etag = generations.collection_etag(request, generations.LABELS, current_user)
+                response = generations.not_modified(request, etag)
+                if response is not None:
+                    return response
                 labels = Label.objects.filter(Q(user=current_user)).exclude(is_deleted=True)
                 serializer = LabelSerializer(labels, many=True)
 
             result = utils.manage_response(status=True, message='retrieved successfully', data=serializer.data,
                                            log='retrieved labels', logger_obj=logger)
-            return Response(result, status.HTTP_200_OK,content_type="application/json")
+            response = Response(result, status.HTTP_200_OK,content_type="application/json")
+            if etag is not None:
+                response['ETag'] = etag
+            return response
 
         except CustomError as e:
             result = utils.manage_response(status=False, message=e.message, log=str(e),
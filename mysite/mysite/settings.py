@@ -21,6 +21,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECONDS_IN_DAY = 24 * 60 * 60
 MINUTE_CONVERSION_CONSTANT = 60
 MINUTES_IN_HOUR = 60
+MAX_PAGE_SIZE = 100
+SUGGESTION_LIMIT = 5
+MAX_SUGGESTION_LIMIT = 20
+MAX_BATCH_OPERATIONS = 100
+MAX_BULK_STATE_IDS = 1000
+NOTE_LIST_CACHE_TIMEOUT = 60*15
+TRASH_RETENTION_DAYS = config('TRASH_RETENTION_DAYS', default=30, cast=int)
+PURGE_BATCH_SIZE = 500
+CACHE_WARMUP_ENABLED = config('CACHE_WARMUP_ENABLED', default=False, cast=bool)
+CACHE_WARMUP_QUERY_BUDGET = config('CACHE_WARMUP_QUERY_BUDGET', default=10, cast=int)
+NOTE_SEARCH_BACKEND = config('NOTE_SEARCH_BACKEND', default='notes.search.PostgresSearchBackend')
 LOGIN_URL = 'accountmanagement.views.login'
 
 # Quick-start development settings - unsuitable for production
@@ -41,7 +52,11 @@ CELERY_BEAT_SCHEDULE = {
 'check-reminder-every-hour': {
          'task': 'accountmanagement.tasks.check_reminder',
          'schedule': crontab(minute='*/1'),
-        }
+        },
+'purge-trashed-notes-every-night': {
+         'task': 'accountmanagement.tasks.purge_trashed_notes',
+         'schedule': crontab(hour=3, minute=0),
+        },
 }
 
 
@@ -56,7 +71,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'accountmanagement',
-    'notes',
+    'notes.apps.NotesConfig',
     'labels',
     'colorfield',
 ]
@@ -66,6 +81,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'NON_FIELD_ERRORS_KEY': 'error',
+    'DEFAULT_RENDERER_CLASSES': (
+        'services.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'services.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     )
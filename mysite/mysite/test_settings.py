@@ -7,4 +7,6 @@ DATABASES = {
 }
 }
 
-EMAIL_BACKEND ='django.core.mail.backends.locmem.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND ='django.core.mail.backends.locmem.EmailBackend'
+
+NOTE_SEARCH_BACKEND = 'notes.search.SQLiteSearchBackend'
@@ -0,0 +1,147 @@
+"""
+Overview: contains logic for keeping NoteAccess rows in sync with note owners and collaborators
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+from django.db import transaction
+from django.db.models import BooleanField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Note, NoteAccess
+
+Collaborator = Note.collaborators.through
+
+
+def listing_state(note):
+    """[copies the state of a note that listings filter and sort on, as stored in its access rows]
+
+    :param note: [mandatory]:[Note]note or dictionary of its fields
+    :return: dictionary of NoteAccess.LISTING_FIELDS
+    """
+    get = note.get if isinstance(note, dict) else lambda field: getattr(note, field)
+    return {'is_trashed': get('is_trashed'), 'is_archived': get('is_archived'), 'is_pinned': bool(get('is_pinned')),
+            'updated_at': get('updated_at')}
+
+
+def listing_states(note_ids):
+    """[reads listing state of given notes in one query]
+
+    :return: dictionary mapping note id to listing state
+    """
+    return {note['id']: listing_state(note)
+            for note in Note.objects.filter(id__in=note_ids).values('id', *NoteAccess.LISTING_FIELDS)}
+
+
+def sync_listing_state(note_ids):
+    """[copies current listing state of notes into all their access rows with one UPDATE, after notes were
+        written with bulk queries]
+
+    :param note_ids: [mandatory]:[list]ids of notes
+    :return: -
+    """
+    def current(field):
+        return Subquery(Note.objects.filter(id=OuterRef('note_id')).values(field)[:1])
+
+    state = {field: current(field) for field in NoteAccess.LISTING_FIELDS}
+    state['is_pinned'] = Coalesce(current('is_pinned'), Value(False), output_field=BooleanField())
+    NoteAccess.objects.filter(note_id__in=note_ids).update(**state)
+
+
+def sync_owner_access(note, created=False):
+    """[makes sure the note owner, and only the owner, holds the owner role of the note, and that every access row
+        holds the current listing state of the note]
+
+    :param note: [mandatory]:[Note]saved note
+    :param created: [optional]:[boolean]True if note was just created
+    :return: -
+    """
+    if created:
+        if note.user_id:
+            NoteAccess.objects.create(note=note, account_id=note.user_id, role=NoteAccess.OWNER, **listing_state(note))
+        return
+    NoteAccess.objects.filter(note=note).update(**listing_state(note))
+    if note.user_id and NoteAccess.objects.filter(note=note, account_id=note.user_id, role=NoteAccess.OWNER).exists():
+        return
+    rebuild_access([note.id])                                 # owner changed, previous owner may still collaborate
+
+
+def grant_collaborator_access(pairs):
+    """[adds collaborator rows, leaving existing owner rows untouched]
+
+    :param pairs: [mandatory]:[list](note id, account id) tuples
+    :return: -
+    """
+    states = listing_states({note_id for note_id, account_id in pairs})
+    NoteAccess.objects.bulk_create([NoteAccess(note_id=note_id, account_id=account_id, role=NoteAccess.COLLABORATOR,
+                                               **states[note_id])
+                                    for note_id, account_id in pairs if note_id in states], ignore_conflicts=True)
+
+
+def revoke_collaborator_access(note_ids=None, account_ids=None):
+    """[removes collaborator rows matching given notes and/or accounts]
+
+    :param note_ids: [optional]:[list]ids of notes
+    :param account_ids: [optional]:[list]ids of accounts
+    :return: -
+    """
+    access = NoteAccess.objects.filter(role=NoteAccess.COLLABORATOR)
+    if note_ids is not None:
+        access = access.filter(note_id__in=note_ids)
+    if account_ids is not None:
+        access = access.filter(account_id__in=account_ids)
+    access.delete()
+
+
+def expected_access(note_ids):
+    """[computes access rows implied by owners and collaborators of given notes]
+
+    :param note_ids: [mandatory]:[list]ids of notes
+    :return: dictionary mapping (note id, account id) to role
+    """
+    rows = {}
+    for note_id, account_id in Collaborator.objects.filter(note_id__in=note_ids).values_list('note_id', 'account_id'):
+        rows[(note_id, account_id)] = NoteAccess.COLLABORATOR
+    for note_id, account_id in Note.objects.filter(id__in=note_ids, user__isnull=False).values_list('id', 'user_id'):
+        rows[(note_id, account_id)] = NoteAccess.OWNER
+    return rows
+
+
+def find_inconsistencies(note_ids):
+    """[compares stored access rows of given notes with owners and collaborators]
+
+    :param note_ids: [mandatory]:[list]ids of notes
+    :return: (missing, unexpected) lists of (note id, account id, role) tuples
+    """
+    expected = {(note_id, account_id, role) for (note_id, account_id), role in expected_access(note_ids).items()}
+    actual = set(NoteAccess.objects.filter(note_id__in=note_ids).values_list('note_id', 'account_id', 'role'))
+    return sorted(expected - actual), sorted(actual - expected)
+
+
+def rebuild_access(note_ids):
+    """[replaces access rows of given notes with freshly computed ones]
+
+    :param note_ids: [mandatory]:[list]ids of notes
+    :return: number of access rows written
+    """
+    states = listing_states(note_ids)
+    rows = [NoteAccess(note_id=note_id, account_id=account_id, role=role, **states[note_id])
+            for (note_id, account_id), role in expected_access(note_ids).items()]
+    with transaction.atomic():
+        NoteAccess.objects.filter(note_id__in=note_ids).delete()
+        NoteAccess.objects.bulk_create(rows)
+    return len(rows)
+
+
+def note_id_batches(batch_size):
+    """[walks over all note ids in ascending batches without loading the whole table]
+
+    :param batch_size: [mandatory]:[int]number of ids per batch
+    :return: generator of id lists
+    """
+    last_id = 0
+    while True:
+        batch = list(Note.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
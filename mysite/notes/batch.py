@@ -0,0 +1,282 @@
+"""
+Overview: contains logic applying a batch of note create/update/delete operations in one transaction
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from exceptions.exceptions import CustomError, ExceptionType
+from .access import Collaborator
+from .models import Note, NoteAccess
+from .serializers import BatchNoteSerializer, FastNoteSerializer
+from . import utils
+from .signals import access_pairs, bulk_delete, notes_bulk_changed, notes_bulk_deleted
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+OPERATIONS = (CREATE, UPDATE, DELETE)
+NoteLabel = Note.labels.through
+
+
+class NoteBatch:
+    """[validates a list of operations on notes of one user together and applies them with bulk queries.
+        Either every operation is applied or none is]
+    """
+
+    def __init__(self, user_id, operations):
+        """[checks shape of the batch]
+
+        :param user_id: [mandatory]:[int]id of the requesting user
+        :param operations: [mandatory]:[list]dictionaries with op (create/update/delete), id for update and delete,
+                           data with note fields for create and update, collaborators as emails, labels as names
+        """
+        if not isinstance(operations, list) or not operations:
+            raise CustomError(ExceptionType.ValidationError, "operations should be a non empty list")
+        if len(operations) > settings.MAX_BATCH_OPERATIONS:
+            raise CustomError(ExceptionType.LengthError,
+                              "at most {} operations are allowed per batch".format(settings.MAX_BATCH_OPERATIONS))
+        self.user_id = user_id
+        self.operations = operations
+        self.results = [{'index': index, 'op': operation.get('op') if isinstance(operation, dict) else None}
+                        for index, operation in enumerate(operations)]
+        self.valid = True
+
+    def fail(self, index, message):
+        self.results[index].update(status=False, message=message)
+        self.valid = False
+
+    def check_operations(self):
+        """[validates op, id and data of every operation]
+        """
+        seen_ids = set()
+        for index, operation in enumerate(self.operations):
+            if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+                self.fail(index, "op should be one of {}".format(', '.join(OPERATIONS)))
+                continue
+            if operation['op'] != CREATE:
+                if not isinstance(operation.get('id'), int):
+                    self.fail(index, "id of the note is mandatory")
+                elif operation['id'] in seen_ids:
+                    self.fail(index, "note {} appears more than once in the batch".format(operation['id']))
+                seen_ids.add(operation.get('id'))
+            if operation['op'] != DELETE and not isinstance(operation.get('data'), dict):
+                self.fail(index, "data of the note is mandatory")
+            elif operation['op'] != DELETE:
+                for field, kind in (('collaborators', 'emails'), ('labels', 'label names')):
+                    values = operation['data'].get(field)
+                    if values is not None and not (isinstance(values, list) and
+                                                   all(isinstance(value, str) for value in values)):
+                        self.fail(index, "{} should be a list of {}".format(field, kind))
+
+    def resolve_names(self):
+        """[maps all collaborator emails and label names of valid operations to ids, with at most one query each]
+
+        :return: (email to account id, label name to label id) dictionaries
+        """
+        emails, names = set(), set()
+        for index, operation in enumerate(self.operations):
+            if 'status' not in self.results[index] and operation['op'] != DELETE:
+                emails.update(operation['data'].get('collaborators') or [])
+                names.update(operation['data'].get('labels') or [])
+        accounts = utils.resolve_account_ids(emails)
+        labels = utils.get_label_ids(self.user_id) if names else {}
+        return accounts, labels
+
+    def validate(self, notes, accounts, labels):
+        """[validates note fields and relations of every create and update operation]
+
+        :param notes: [mandatory]:[dict]notes of the user targeted by update and delete operations, by id
+        :return: list of (index, operation, validated fields, collaborator ids, label ids) for valid operations
+        """
+        validated = []
+        for index, operation in enumerate(self.operations):
+            if 'status' in self.results[index]:
+                continue
+            if operation['op'] != CREATE and operation['id'] not in notes:
+                self.fail(index, "Requested note does not exist")
+                continue
+            if operation['op'] == DELETE:
+                validated.append((index, operation, None, None, None))
+                continue
+
+            data = operation['data']
+            if operation['op'] == CREATE:
+                if not data.get('title') or not data.get('description'):
+                    self.fail(index, "Title and description mandatory")
+                    continue
+                if not data.get('labels'):
+                    self.fail(index, "Please enter labels")
+                    continue
+            unknown = [email for email in data.get('collaborators') or [] if email not in accounts]
+            unknown += [name for name in data.get('labels') or [] if name not in labels]
+            if unknown:
+                self.fail(index, "No such account or label: {}".format(', '.join(sorted(unknown))))
+                continue
+            serializer = BatchNoteSerializer(data={name: value for name, value in data.items()
+                                                   if name not in ('collaborators', 'labels')},
+                                             partial=operation['op'] == UPDATE)
+            if not serializer.is_valid():
+                self.fail(index, serializer.errors)
+                continue
+            collaborator_ids = [accounts[email] for email in data['collaborators']] \
+                if data.get('collaborators') is not None else None
+            label_ids = [labels[name] for name in data['labels']] if data.get('labels') is not None else None
+            validated.append((index, operation, serializer.validated_data, collaborator_ids, label_ids))
+        return validated
+
+    @staticmethod
+    def insert_notes(notes):
+        """[inserts notes, with one query where the database returns ids of bulk inserted rows (PostgreSQL)
+            and one raw save per note otherwise, so every note gets its id without firing the per note receivers;
+            the batch publishes its own bulk signals]
+        """
+        if connection.features.can_return_rows_from_bulk_insert:
+            Note.objects.bulk_create(notes)
+        else:
+            for note in notes:
+                note.save_base(raw=True)
+
+    @staticmethod
+    def replace_relations(collaborators, labels):
+        """[replaces collaborators and labels of notes, keeping NoteAccess in sync]
+
+        :param collaborators: [mandatory]:[dict]note id to account ids, for notes whose collaborators are set
+        :param labels: [mandatory]:[dict]note id to label ids, for notes whose labels are set
+        """
+        Collaborator.objects.filter(note_id__in=list(collaborators)).delete()
+        NoteLabel.objects.filter(note_id__in=list(labels)).delete()
+        Collaborator.objects.bulk_create([Collaborator(note_id=note_id, account_id=account_id)
+                                          for note_id, account_ids in collaborators.items()
+                                          for account_id in set(account_ids)])
+        NoteLabel.objects.bulk_create([NoteLabel(note_id=note_id, label_id=label_id)
+                                       for note_id, label_ids in labels.items() for label_id in set(label_ids)])
+        NoteAccess.objects.filter(note_id__in=list(collaborators), role=NoteAccess.COLLABORATOR).delete()
+        NoteAccess.objects.bulk_create([NoteAccess(note_id=note_id, account_id=account_id, role=NoteAccess.COLLABORATOR)
+                                        for note_id, account_ids in collaborators.items()
+                                        for account_id in set(account_ids)], ignore_conflicts=True)
+
+    def apply(self):
+        """[validates the whole batch and applies it inside one transaction]
+
+        :return: (True if batch was applied, per operation results)
+        """
+        self.check_operations()
+        accounts, labels = self.resolve_names()
+        with transaction.atomic():
+            target_ids = [operation['id'] for operation in self.operations
+                          if isinstance(operation, dict) and isinstance(operation.get('id'), int)]
+            notes = Note.objects.select_for_update().filter(user=self.user_id, is_trashed=False).in_bulk(target_ids)
+            validated = self.validate(notes, accounts, labels)
+            if not self.valid:
+                for result in self.results:
+                    result.setdefault('status', False)
+                    result.setdefault('message', 'not applied, batch contains invalid operations')
+                return False, self.results
+
+            previous = access_pairs(list(notes))
+            now = timezone.now()
+            created, updated, trashed, fields = {}, [], [], {'updated_at'}
+            collaborators, note_labels = {}, {}
+            for index, operation, data, collaborator_ids, label_ids in validated:
+                if operation['op'] == CREATE:
+                    created[index] = Note(user_id=self.user_id, created_at=now, updated_at=now, **data)
+                elif operation['op'] == UPDATE:
+                    note = notes[operation['id']]
+                    for name, value in data.items():
+                        setattr(note, name, value)
+                    note.updated_at = now
+                    fields.update(data)
+                    updated.append(note)
+                elif operation['op'] == DELETE:
+                    trashed.append(operation['id'])
+
+            self.insert_notes(list(created.values()))
+            NoteAccess.objects.bulk_create([NoteAccess(note_id=note.id, account_id=self.user_id, role=NoteAccess.OWNER)
+                                            for note in created.values()])
+            for index, operation, data, collaborator_ids, label_ids in validated:
+                note_id = created[index].id if operation['op'] == CREATE else operation['id']
+                self.results[index].update(status=True, id=note_id)
+                if collaborator_ids is not None or operation['op'] == CREATE:
+                    collaborators[note_id] = collaborator_ids or []
+                if label_ids is not None:
+                    note_labels[note_id] = label_ids
+            if updated:
+                Note.objects.bulk_update(updated, sorted(fields))
+            if trashed:
+                Note.objects.filter(id__in=trashed).update(is_trashed=True, updated_at=now)
+            self.replace_relations(collaborators, note_labels)
+
+            note_ids = [note.id for note in created.values()] + list(notes)
+            notes_bulk_changed.send(sender=Note, note_ids=note_ids, previous_access=previous)
+
+        rows = FastNoteSerializer.values(Note.objects.filter(id__in=note_ids).order_by('id'))
+        representations = {note['id']: note for note in FastNoteSerializer(list(rows)).data}
+        for result in self.results:
+            if result['op'] != DELETE:
+                result['note'] = representations[result['id']]
+        return True, self.results
+
+
+TRANSITIONS = {                 # action: (state notes must be in, field set, new value)
+    'pin': ({'is_trashed': False}, 'is_pinned', True),
+    'unpin': ({'is_trashed': False}, 'is_pinned', False),
+    'archive': ({'is_trashed': False}, 'is_archived', True),
+    'unarchive': ({'is_trashed': False}, 'is_archived', False),
+    'trash': ({'is_trashed': False}, 'is_trashed', True),
+    'restore': ({'is_trashed': True}, 'is_trashed', False),
+}
+
+
+def transition_notes(user_id, action, note_ids):
+    """[applies a state transition to many notes of the user with a single UPDATE]
+
+    :param user_id: [mandatory]:[int]id of the requesting user
+    :param action: [mandatory]:[string]pin, unpin, archive, unarchive, trash or restore
+    :param note_ids: [mandatory]:[list]ids of notes
+    :return: dictionary of updated, unchanged (already in the requested state) and skipped (not found,
+             not owned or in the wrong state) note ids
+    """
+    if action not in TRANSITIONS:
+        raise CustomError(ExceptionType.ValidationError,
+                          "action should be one of {}".format(', '.join(TRANSITIONS)))
+    if not isinstance(note_ids, list) or not note_ids or not all(isinstance(note_id, int) for note_id in note_ids):
+        raise CustomError(ExceptionType.ValidationError, "ids should be a non empty list of note ids")
+    if len(note_ids) > settings.MAX_BULK_STATE_IDS:
+        raise CustomError(ExceptionType.LengthError,
+                          "at most {} notes are allowed per request".format(settings.MAX_BULK_STATE_IDS))
+    state, field, value = TRANSITIONS[action]
+    note_ids = list(dict.fromkeys(note_ids))
+    with transaction.atomic():
+        current = dict(Note.objects.select_for_update().filter(id__in=note_ids, user=user_id, **state).values_list(
+            'id', field))
+        updated = [note_id for note_id in note_ids if note_id in current and current[note_id] != value]
+        if updated:
+            Note.objects.filter(id__in=updated, user=user_id).update(**{field: value, 'updated_at': timezone.now()})
+            pairs = access_pairs(updated)
+            notes_bulk_changed.send(sender=Note, note_ids=updated, previous_access=pairs)
+    return {'updated': updated,
+            'unchanged': [note_id for note_id in note_ids if current.get(note_id, not value) == value],
+            'skipped': [note_id for note_id in note_ids if note_id not in current]}
+
+
+def purge_notes(note_ids, trashed_before):
+    """[hard deletes notes still trashed since before given time, with their relations, in one short transaction.
+        Per note delete receivers are silenced and notes_bulk_deleted is sent once instead]
+
+    :param note_ids: [mandatory]:[list]ids of candidate notes
+    :param trashed_before: [mandatory]:[datetime]notes trashed (last updated) after this are kept
+    :return: list of (id, image name) of purged notes
+    """
+    with transaction.atomic(), bulk_delete():
+        purged = list(Note.objects.select_for_update(skip_locked=True).filter(
+            id__in=note_ids, is_trashed=True, updated_at__lt=trashed_before).values_list('id', 'image'))
+        purged_ids = [note_id for note_id, image in purged]
+        if not purged_ids:
+            return []
+        previous = access_pairs(purged_ids)
+        Note.objects.filter(id__in=purged_ids).delete()
+        notes_bulk_deleted.send(sender=Note, note_ids=purged_ids, previous_access=previous)
+    return purged
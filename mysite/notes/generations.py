@@ -0,0 +1,111 @@
+"""
+Overview: contains per user change generations of note and label collections used as cheap ETag validators
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import hashlib
+import logging
+import time
+import redis
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from services.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+NOTES = 'NOTES'
+LABELS = 'LABELS'
+
+
+def generation_key(kind, user_id):
+    return Cache.getInstance().make_key("USER_" + str(user_id) + "_" + kind + "_GENERATION")
+
+
+def initial_generation():
+    """[starts a missing generation from the current time in ms, so a generation lost from redis never
+        restarts at a value a client may still hold as ETag]
+    """
+    return int(time.time() * 1000)
+
+
+def get_generation(kind, user_id):
+    """[reads current generation of a collection of user, creating it if missing]
+
+    :param kind: [mandatory]:[string]NOTES or LABELS
+    :param user_id: [mandatory]:[int]id of the user
+    :return: generation or None if redis is unavailable
+    """
+    key = generation_key(kind, user_id)
+    try:
+        generation = Cache.getInstance().cache.get(key)
+        if generation is None:
+            Cache.getInstance().cache.set(key, initial_generation(), nx=True)
+            generation = Cache.getInstance().cache.get(key)
+        return int(generation)
+    except redis.RedisError as e:
+        logger.warning("could not read %s generation of user %s: %s", kind, user_id, e)
+        return None
+
+
+def bump_generations(kind, user_ids):
+    """[advances generation of a collection for every given user in one round trip]
+
+    :param kind: [mandatory]:[string]NOTES or LABELS
+    :param user_ids: [mandatory]:[iterable]ids of users whose collection changed
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    try:
+        pipeline = Cache.getInstance().cache.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipeline.set(generation_key(kind, user_id), initial_generation(), nx=True)
+            pipeline.incr(generation_key(kind, user_id))
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.error("could not bump %s generation of users %s: %s", kind, sorted(user_ids), e)
+
+
+def fingerprint(request):
+    """[hashes path and query params of request, so every listing, filter, page and representation
+        gets its own validator and cache key]
+    """
+    return hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()[:12]
+
+
+def collection_etag(request, kind, user_id, generation=None):
+    """[builds ETag of a collection listing from the user's generation and the request fingerprint]
+
+    :param generation: [optional]:[int]generation already read for this request
+    :return: quoted ETag or None if generation is unavailable
+    """
+    if generation is None:
+        generation = get_generation(kind, user_id)
+    if generation is None:
+        return None
+    return quote_etag("{}-{}-{}-{}".format(kind.lower(), user_id, generation, fingerprint(request)))
+
+
+def collection_cache_key(request, kind, user_id, generation):
+    """[builds cache key of a collection page. Embedding the generation makes every page cached before a
+        change unreachable once the generation is bumped, those pages then just expire]
+    """
+    return "USER_" + str(user_id) + "_" + kind + "_" + str(generation) + "_PAGE_" + fingerprint(request)
+
+
+def not_modified(request, etag):
+    """[checks If-None-Match header of request against etag, using weak comparison]
+
+    :return: 304 Response if client copy is current else None
+    """
+    if etag is None:
+        return None
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return None
+    client_etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(header)]
+    if '*' in client_etags or etag in client_etags:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from notes import access
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds NoteAccess rows from note owners and collaborators in batches of note ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='number of notes rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        notes = rows = 0
+        for batch in access.note_id_batches(options['batch_size']):
+            rows += access.rebuild_access(batch)
+            notes += len(batch)
+        self.stdout.write(self.style.SUCCESS('Backfilled {} access rows for {} notes'.format(rows, notes)))
@@ -0,0 +1,113 @@
+import json
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accountmanagement.models import Account
+from labels.models import Label
+from notes import access
+from notes.models import Note
+from notes.serializers import FastNoteSerializer, NoteSerializer
+from rest_framework.renderers import JSONRenderer
+from services.codec import Codec
+from services.renderers import FastJSONRenderer, loads
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks note read paths on seeded note lists, rolling the seeded data back afterwards'
+
+    suites = ('serializers', 'renderers', 'codec')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suite', choices=self.suites, nargs='+', default=self.suites,
+                            help='read paths to be measured')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='number of notes per list')
+        parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, best one is reported')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                owner = self.seed(size)
+                for suite in options['suite']:
+                    getattr(self, 'benchmark_' + suite)(owner, size, options['repeat'])
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def account():
+        name = uuid.uuid4().hex[:20]
+        return Account.objects.create(first_name='benchmark', last_name='user', user_name=name,
+                                      email='{}@benchmark.invalid'.format(name))
+
+    def seed(self, size):
+        owner = self.account()
+        labels = [Label.objects.create(user=owner, name='benchmark {}'.format(uuid.uuid4().hex)) for index in range(5)]
+        collaborators = [self.account() for index in range(5)]
+        Note.objects.bulk_create([Note(user=owner, title='note {}'.format(index), description='benchmark ' * 20,
+                                       is_pinned=index % 10 == 0) for index in range(size)])
+        note_ids = list(Note.objects.filter(user=owner).values_list('id', flat=True))
+        Note.labels.through.objects.bulk_create([Note.labels.through(note_id=note_id, label_id=labels[index % 5].id)
+                                                 for index, note_id in enumerate(note_ids)])
+        Note.collaborators.through.objects.bulk_create([
+            Note.collaborators.through(note_id=note_id, account_id=collaborators[index % 5].id)
+            for index, note_id in enumerate(note_ids)])
+        access.rebuild_access(note_ids)
+        return owner
+
+    def measure(self, repeat, function):
+        timings = []
+        for run in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    def report(self, suite, size, name, seconds, nbytes=None):
+        line = '{:<12} {:>6} notes  {:<28} {:>9.1f} ms'.format(suite, size, name, seconds * 1000)
+        if nbytes is not None:
+            line += '  {:>10} bytes'.format(nbytes)
+        self.stdout.write(line)
+
+    def benchmark_serializers(self, owner, size, repeat):
+        notes = Note.objects.visible_to(owner.id).active().order_by('id')
+        drf_time, drf_data = self.measure(repeat, lambda: NoteSerializer(notes.with_relations(), many=True).data)
+        fast_time, fast_data = self.measure(repeat, lambda: FastNoteSerializer(list(FastNoteSerializer.values(notes))).data)
+        self.report('serializers', size, 'NoteSerializer', drf_time)
+        self.report('serializers', size, 'FastNoteSerializer', fast_time)
+        if json.dumps(drf_data) != json.dumps(fast_data):
+            self.stdout.write(self.style.ERROR('FastNoteSerializer output differs from NoteSerializer'))
+
+    def benchmark_renderers(self, owner, size, repeat):
+        notes = Note.objects.visible_to(owner.id).active()
+        data = {'status': True, 'message': 'retrieved successfully',
+                'data': FastNoteSerializer(list(FastNoteSerializer.values(notes))).data}
+        drf_time, drf_content = self.measure(repeat, lambda: JSONRenderer().render(data))
+        fast_time, fast_content = self.measure(repeat, lambda: FastJSONRenderer().render(data))
+        self.report('renderers', size, 'JSONRenderer', drf_time)
+        self.report('renderers', size, 'FastJSONRenderer', fast_time)
+        if loads(drf_content) != loads(fast_content):
+            self.stdout.write(self.style.ERROR('FastJSONRenderer output differs from JSONRenderer'))
+
+    def benchmark_codec(self, owner, size, repeat):
+        details = [NoteSerializer(note).data for note in Note.objects.visible_to(owner.id).active().with_relations()]
+        page = {'data': FastNoteSerializer(list(FastNoteSerializer.values(Note.objects.visible_to(owner.id)
+                                                                          .active()))).data, 'next': None}
+        codecs = (('msgpack+zlib', Codec()), ('json+zlib', Codec(use_msgpack=False)),
+                  ('msgpack', Codec(compress_threshold=float('inf'))))
+        str_time, str_values = self.measure(repeat, lambda: [str(data) for data in details])
+        self.report('codec', size, 'details str()', str_time, sum(len(value.encode('utf-8')) for value in str_values))
+        for name, codec in codecs:
+            encode_time, encoded = self.measure(repeat, lambda: [codec.encode(data) for data in details])
+            decode_time, decoded = self.measure(repeat, lambda: [codec.decode(data) for data in encoded])
+            self.report('codec', size, 'details encode ' + name, encode_time, sum(len(data) for data in encoded))
+            self.report('codec', size, 'details decode ' + name, decode_time)
+            if decoded != details:
+                self.stdout.write(self.style.ERROR('{} does not round trip note details'.format(name)))
+        str_time, str_page = self.measure(repeat, lambda: str(page))
+        self.report('codec', size, 'page str()', str_time, len(str_page.encode('utf-8')))
+        for name, codec in codecs:
+            encode_time, encoded = self.measure(repeat, lambda: codec.encode(page))
+            decode_time, decoded = self.measure(repeat, lambda: codec.decode(encoded))
+            self.report('codec', size, 'page encode ' + name, encode_time, len(encoded))
+            self.report('codec', size, 'page decode ' + name, decode_time)
+            if decoded != page:
+                self.stdout.write(self.style.ERROR('{} does not round trip note pages'.format(name)))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from notes import access
+
+
+class Command(BaseCommand):
+    help = 'Reports NoteAccess rows that disagree with note owners and collaborators'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='number of notes checked per query')
+        parser.add_argument('--fix', action='store_true', help='rebuild access rows of inconsistent notes')
+
+    def handle(self, *args, **options):
+        inconsistent_notes = set()
+        for batch in access.note_id_batches(options['batch_size']):
+            missing, unexpected = access.find_inconsistencies(batch)
+            for note_id, account_id, role in missing:
+                self.stdout.write('missing: note {} account {} role {}'.format(note_id, account_id, role))
+            for note_id, account_id, role in unexpected:
+                self.stdout.write('unexpected: note {} account {} role {}'.format(note_id, account_id, role))
+            inconsistent_notes.update(row[0] for row in missing + unexpected)
+
+        if not inconsistent_notes:
+            self.stdout.write(self.style.SUCCESS('NoteAccess is consistent'))
+            return
+        if options['fix']:
+            access.rebuild_access(sorted(inconsistent_notes))
+            self.stdout.write(self.style.SUCCESS('Rebuilt access rows for {} notes'.format(len(inconsistent_notes))))
+            return
+        raise CommandError('{} notes have inconsistent access rows'.format(len(inconsistent_notes)))
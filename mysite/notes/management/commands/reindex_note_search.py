@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from notes import access, search
+
+
+class Command(BaseCommand):
+    help = 'Indexes title and description of all notes with the configured search backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='number of notes indexed per batch')
+
+    def handle(self, *args, **options):
+        backend = search.get_search_backend()
+        notes = 0
+        for batch in access.note_id_batches(options['batch_size']):
+            backend.index_notes(batch)
+            notes += len(batch)
+        self.stdout.write(self.style.SUCCESS('Indexed {} notes with {}'.format(notes, type(backend).__name__)))
@@ -1,9 +1,67 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
 from accountmanagement.models import Account
 from labels.models import Label
 
 
+class NoteQuerySet(models.QuerySet):
+
+    def visible_to(self, user_id, role=None):
+        """[filters notes the account owns or collaborates on through NoteAccess.
+            Each (note, account) pair is stored once, so no DISTINCT is needed. The copy of the note state kept
+            in the access row is annotated as access_<field>, so filters and ordering on it use the NoteAccess
+            listing indexes]
+
+        :param user_id: [mandatory]:[int]id of the requesting account
+        :param role: [optional]:[string]NoteAccess.OWNER or NoteAccess.COLLABORATOR
+        :return: filtered queryset
+        """
+        if role is None:
+            notes = self.filter(access__account=user_id)
+        else:
+            notes = self.filter(access__account=user_id, access__role=role)
+        return notes.annotate(access_note_id=F('access__note'),
+                              **{'access_' + field: F('access__' + field) for field in NoteAccess.LISTING_FIELDS})
+
+    def state(self, **conditions):
+        """[filters on note state, on its copy in NoteAccess when the notes are listed through visible_to]
+        """
+        if 'access_is_trashed' in self.query.annotations:
+            conditions = {'access_' + field: value for field, value in conditions.items()}
+        return self.filter(**conditions)
+
+    def with_relations(self):
+        """[prefetches labels and collaborators, so serializing any number of notes takes two extra queries]
+        """
+        return self.prefetch_related(
+            models.Prefetch('labels', queryset=Label.objects.only('id', 'name').order_by('id')),
+            models.Prefetch('collaborators', queryset=Account.objects.only('id', 'email').order_by('id')))
+
+    def active(self):
+        return self.state(is_trashed=False)
+
+    def archived(self):
+        return self.state(is_trashed=False, is_archived=True)
+
+    def pinned(self):
+        return self.state(is_trashed=False, is_pinned=True)
+
+    def trashed(self):
+        return self.state(is_trashed=True)
+
+    def with_reminder_between(self, start, end):
+        """[filters notes whose reminder falls within (start, end]]
+
+        :param start: [mandatory]:[datetime]exclusive lower bound
+        :param end: [mandatory]:[datetime]inclusive upper bound
+        :return: filtered queryset
+        """
+        return self.filter(reminder__isnull=False, reminder__gt=start, reminder__lte=end)
+
+
 class Note(models.Model):
     user = models.ForeignKey(Account , on_delete = models.CASCADE , related_name = 'author', null = True, blank = True)
     title = models.CharField(max_length = 140, blank = True)
@@ -19,15 +77,89 @@ class Note(models.Model):
     is_pinned = models.BooleanField(default = False, blank = True, null = True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now = True)
+    search_vector = SearchVectorField(null = True, editable = False)
+
+    objects = NoteQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields = ['reminder'], name = 'note_reminder_idx', condition = Q(reminder__isnull = False)),
+        ]
 
     def __str__(self):
         return self.title
 
     def soft_delete(self):
         self.is_trashed = True
-        self.save()  
+        self.save()
 
-    
-    
 
+class NoteAccess(models.Model):
+    """
+    Denormalized visibility of notes: one row per account that owns or collaborates on a note, together with
+    a copy of the note state listings filter and sort on, so every page of a listing is read in order from
+    one index. Kept in sync by notes.signals
+    """
+    OWNER = 'owner'
+    COLLABORATOR = 'collaborator'
+    ROLE_CHOICES = [(OWNER, 'Owner'), (COLLABORATOR, 'Collaborator')]
+    LISTING_FIELDS = ('is_trashed', 'is_archived', 'is_pinned', 'updated_at')
+
+    note = models.ForeignKey(Note, on_delete = models.CASCADE, related_name = 'access')
+    account = models.ForeignKey(Account, on_delete = models.CASCADE, related_name = 'note_access')
+    role = models.CharField(max_length = 12, choices = ROLE_CHOICES)
+    is_trashed = models.BooleanField(default = False)
+    is_archived = models.BooleanField(default = False)
+    is_pinned = models.BooleanField(default = False)                 # null is_pinned of the note is stored as False
+    updated_at = models.DateTimeField(default = timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields = ['account', 'note'], name = 'unique_note_access'),
+        ]
+        indexes = [
+            models.Index(fields = ['account', 'is_trashed', '-is_pinned', '-updated_at', '-note'],
+                         name = 'note_access_listing_idx'),
+            models.Index(fields = ['account', '-is_pinned', '-updated_at', '-note'], name = 'note_access_archived_idx',
+                         condition = Q(is_archived = True, is_trashed = False)),
+            models.Index(fields = ['account', '-updated_at', '-note'], name = 'note_access_pinned_idx',
+                         condition = Q(is_pinned = True, is_trashed = False)),
+        ]
+
+    def __str__(self):
+        return '{} {} of note {}'.format(self.account_id, self.role, self.note_id)
+
+
+class SyncCounter(models.Model):
+    """
+    Last sync sequence handed out to an account. Its row is locked while changes are recorded,
+    so sequences of an account become visible in the order they were allocated
+    """
+    account = models.OneToOneField(Account, on_delete = models.CASCADE, primary_key = True, related_name = 'sync_counter')
+    value = models.BigIntegerField(default = 0)
+
+    def __str__(self):
+        return '{} at {}'.format(self.account_id, self.value)
+
+
+class NoteChange(models.Model):
+    """
+    Latest change of a note as seen by an account, read by delta sync. A deleted change is a tombstone
+    of a note that was deleted or is no longer shared with the account
+    """
+    account = models.ForeignKey(Account, on_delete = models.CASCADE, related_name = 'note_changes')
+    note_id = models.IntegerField()
+    seq = models.BigIntegerField()
+    deleted = models.BooleanField(default = False)
+    changed_at = models.DateTimeField(auto_now = True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields = ['account', 'note_id'], name = 'unique_note_change'),
+        ]
+        indexes = [
+            models.Index(fields = ['account', 'seq'], name = 'note_change_seq_idx'),
+        ]
+
+    def __str__(self):
+        return '{} of note {} for {}'.format(self.seq, self.note_id, self.account_id)
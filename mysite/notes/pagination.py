@@ -0,0 +1,109 @@
+"""
+Overview: contains keyset (cursor) pagination used by note listing apis
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import base64
+import json
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from exceptions.exceptions import CustomError, ExceptionType
+
+
+# state and id as copied into NoteAccess, matching the column order of its listing indexes
+NOTE_ORDERING = (F('access_is_pinned').desc(), F('access_updated_at').desc(), F('access_note_id').desc())
+
+
+class NoteCursorPagination:
+    """[paginates notes listed through Note.objects.visible_to, ordered by (is_pinned, updated_at, id) using an
+        opaque cursor.
+        Each page seeks directly past the last note of the previous page, so every page costs the same
+        irrespective of its depth]
+    """
+
+    def __init__(self, request):
+        """[reads limit and cursor from query params of request]
+
+        :param request: [optional]:[int]limit: number of notes per page
+                        [optional]:[string]cursor: next cursor returned with previous page
+        """
+        self.limit = self.get_limit(request.query_params.get('limit'))
+        self.position = self.decode_cursor(request.query_params.get('cursor'))
+        self.next_cursor = None
+
+    @staticmethod
+    def get_limit(limit):
+        """[validates requested page size]
+
+        :param limit: [optional]:[string]number of notes per page
+        :return: page size bounded by MAX_PAGE_SIZE
+        """
+        if limit is None or limit == '':
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise CustomError(ExceptionType.ValidationError, "limit should be a positive integer")
+        if limit <= 0:
+            raise CustomError(ExceptionType.ValidationError, "limit should be a positive integer")
+        return min(limit, settings.MAX_PAGE_SIZE)
+
+    @staticmethod
+    def encode_cursor(is_pinned, updated_at, note_id):
+        """[encodes position of a note in the listing order as an opaque string]
+
+        :return: urlsafe cursor string
+        """
+        position = json.dumps([is_pinned, updated_at.isoformat(), note_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(position.encode('utf-8')).decode('utf-8').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """[decodes cursor received from client]
+
+        :param cursor: [optional]:[string]cursor returned as next by previous page
+        :return: (is_pinned, updated_at, id) tuple or None for first page
+        """
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            is_pinned, updated_at, note_id = json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+            updated_at = parse_datetime(updated_at)
+            if is_pinned not in (True, False, None) or updated_at is None or not isinstance(note_id, int):
+                raise ValueError(cursor)
+            return is_pinned, updated_at, note_id
+        except (ValueError, TypeError):
+            raise CustomError(ExceptionType.ValidationError, "Invalid cursor")
+
+    @staticmethod
+    def after(is_pinned, updated_at, note_id):
+        """[builds filter selecting notes placed after given position in the listing order]
+
+        :return: Q object
+        """
+        later = Q(access_updated_at__lt=updated_at) | Q(access_updated_at=updated_at, access_note_id__lt=note_id)
+        if is_pinned:
+            return (Q(access_is_pinned=True) & later) | Q(access_is_pinned=False)
+        return Q(access_is_pinned=False) & later
+
+    def paginate_queryset(self, queryset):
+        """[fetches one page of notes and remembers cursor for the next page]
+
+        :param queryset: notes to be paginated, either model instances or .values() rows
+        :return: list of notes in current page
+        """
+        queryset = queryset.order_by(*NOTE_ORDERING)
+        if self.position:
+            queryset = queryset.filter(self.after(*self.position))
+        page = list(queryset[:self.limit + 1])
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            last = page[-1]
+            if isinstance(last, dict):
+                self.next_cursor = self.encode_cursor(bool(last['is_pinned']), last['updated_at'], last['id'])
+            else:
+                self.next_cursor = self.encode_cursor(bool(last.is_pinned), last.updated_at, last.id)
+        return page
@@ -0,0 +1,72 @@
+"""
+Overview: contains query planner compiling note listing filters into a single queryset
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+from django.db.models import Q
+from exceptions.exceptions import CustomError, ExceptionType
+from .models import Note, NoteAccess
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+
+class NoteQuery:
+    """[compiles listing filters of a user into one queryset over the note state copied into NoteAccess, so
+        it is served by the NoteAccess listing indexes. Trashed notes are only listed for their owner]
+    """
+    BOOLEAN_FILTERS = ('pinned', 'archived', 'trashed', 'has_reminder', 'shared')
+    TEXT_FILTERS = ('label', 'color')
+
+    def __init__(self, user_id, params, **presets):
+        """[reads filters from query params, presets of a specialised listing take precedence]
+
+        :param user_id: [mandatory]:[int]id of the requesting user
+        :param params: [mandatory]:[dict]query params: pinned, archived, trashed, has_reminder, shared, label, color
+        :param presets: [optional]:filters fixed by the view, e.g. archived=True
+        """
+        self.user_id = user_id
+        self.filters = {}
+        for name in self.BOOLEAN_FILTERS:
+            if params.get(name) not in (None, ''):
+                self.filters[name] = self.parse_boolean(name, params.get(name))
+        for name in self.TEXT_FILTERS:
+            if params.get(name):
+                self.filters[name] = params.get(name)
+        self.filters.update(presets)
+
+    @staticmethod
+    def parse_boolean(name, value):
+        try:
+            return BOOLEAN_VALUES[value.lower()]
+        except KeyError:
+            raise CustomError(ExceptionType.ValidationError, "{} should be true or false".format(name))
+
+    def queryset(self):
+        """[builds the queryset for all filters at once]
+
+        :return: queryset of matching notes
+        """
+        filters = self.filters
+        if filters.get('trashed'):
+            if filters.get('shared'):
+                return Note.objects.none()
+            notes = Note.objects.visible_to(self.user_id, role=NoteAccess.OWNER).trashed()
+        elif 'shared' in filters:
+            role = NoteAccess.COLLABORATOR if filters['shared'] else NoteAccess.OWNER
+            notes = Note.objects.visible_to(self.user_id, role=role).active()
+        else:
+            notes = Note.objects.visible_to(self.user_id).active()
+
+        conditions = Q()
+        if 'pinned' in filters:
+            conditions &= Q(access_is_pinned=filters['pinned'])
+        if 'archived' in filters:
+            conditions &= Q(access_is_archived=filters['archived'])
+        if 'has_reminder' in filters:
+            conditions &= Q(reminder__isnull=not filters['has_reminder'])
+        if 'color' in filters:
+            conditions &= Q(color__iexact=filters['color'])
+        if 'label' in filters:
+            conditions &= Q(labels__name=filters['label'])
+        return notes.filter(conditions)
@@ -0,0 +1,474 @@
+"""
+Overview: contains pluggable search backends used by note search api
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import bisect
+import functools
+import heapq
+import math
+import datetime
+import re
+from collections import defaultdict, namedtuple
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, CharField, F, FloatField, Func, IntegerField, Lookup, Q, Value, When
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from services.cache import Cache
+from .models import Note, NoteAccess
+
+TOKEN_PATTERN = re.compile(r'\w+')
+WORD_SIMILARITY_THRESHOLD = 0.6                                  # same default as pg_trgm.word_similarity_threshold
+TITLE_BOOST = 3.0
+RECENCY_HALF_LIFE_DAYS = 30
+MAX_CANDIDATES = 1000
+SNIPPET_LENGTH = 160
+INDEX_TIMEOUT = 60*60*24                    # seconds a user's inverted index is kept before it is rebuilt from scratch
+BUILD_TIMEOUT = 60                          # seconds a build may take before another search can start one
+BUILDING = b'building'
+CLOCK_SKEW = datetime.timedelta(seconds=5)
+
+RankedNote = namedtuple('RankedNote', ['score', 'note_id', 'description'])
+
+
+def tokenize(text):
+    """[splits text into lowercase word tokens]
+
+    :param text: [mandatory]:[string]search terms or note text
+    :return: list of tokens
+    """
+    return [token.lower() for token in TOKEN_PATTERN.findall(text or '')]
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_backend():
+    """[returns instance of backend configured by NOTE_SEARCH_BACKEND setting]
+    """
+    return import_string(settings.NOTE_SEARCH_BACKEND)()
+
+
+def order_by_ids(queryset, note_ids):
+    """[restricts queryset to given ids keeping their order]
+
+    :param queryset: notes to be filtered
+    :param note_ids: [mandatory]:[list]ranked ids of notes
+    :return: ordered queryset
+    """
+    if not note_ids:
+        return queryset.none()
+    position = Case(*[When(id=note_id, then=index) for index, note_id in enumerate(note_ids)],
+                    output_field=IntegerField())
+    return queryset.filter(id__in=note_ids).annotate(position=position).order_by('position')
+
+
+def relevance(terms, title, description, updated_at, now):
+    """[scores a note by frequency of term prefixes, counting title matches TITLE_BOOST times,
+        multiplied by a recency factor decaying from 2 to 1 with a half life of RECENCY_HALF_LIFE_DAYS]
+
+    :return: relevance score
+    """
+    title_tokens = tokenize(title)
+    description_tokens = tokenize(description)
+    score = 0.0
+    for term in terms:
+        score += TITLE_BOOST * math.log1p(sum(1 for token in title_tokens if token.startswith(term)))
+        score += math.log1p(sum(1 for token in description_tokens if token.startswith(term)))
+    age_in_days = max((now - updated_at).total_seconds(), 0) / (24 * 60 * 60)
+    return score * (1 + 0.5 ** (age_in_days / RECENCY_HALF_LIFE_DAYS))
+
+
+def rank_notes(queryset, terms, limit):
+    """[streams matching notes and keeps the best `limit` of them in a bounded heap,
+        so no more than limit candidates are held in memory at a time]
+
+    :param queryset: [mandatory]:notes matched by search backend, best first
+    :param terms: [mandatory]:[list]tokens of search query
+    :param limit: [mandatory]:[int]number of results
+    :return: list of RankedNote, best first
+    """
+    now = timezone.now()
+    heap = []
+    rows = queryset.values_list('id', 'title', 'description', 'updated_at')[:MAX_CANDIDATES]
+    for note_id, title, description, updated_at in rows.iterator():
+        candidate = RankedNote(relevance(terms, title, description, updated_at, now), note_id, description)
+        if len(heap) < limit:
+            heapq.heappush(heap, candidate)
+        elif candidate > heap[0]:
+            heapq.heapreplace(heap, candidate)
+    return sorted(heap, reverse=True)
+
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """[cuts a short snippet around the first match in text and wraps matched words in <b> tags]
+
+    :param text: [mandatory]:[string]description of note
+    :param terms: [mandatory]:[list]tokens of search query
+    :param length: [optional]:[int]maximum number of characters taken from text
+    :return: html escaped snippet
+    """
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(term) for term in terms) + r')\w*', re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(match.start() - length // 4, 0) if match else 0
+    fragment = text[start:start + length]
+    snippet = ['...'] if start > 0 else []
+    position = 0
+    for matched in pattern.finditer(fragment):
+        snippet.append(escape(fragment[position:matched.start()]))
+        snippet.append('<b>' + escape(matched.group(0)) + '</b>')
+        position = matched.end()
+    snippet.append(escape(fragment[position:]))
+    if start + length < len(text):
+        snippet.append('...')
+    return ''.join(snippet)
+
+
+def trigrams(text):
+    """[splits text into the padded word trigrams used by pg_trgm]
+
+    :param text: [mandatory]:[string]title or typed text
+    :return: set of trigrams
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = '  ' + word + ' '
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(query_trigrams, text_trigrams):
+    """[share of typed trigrams found in text, so a typed prefix of a word scores high]
+
+    :return: similarity between 0 and 1
+    """
+    if not query_trigrams:
+        return 0.0
+    return len(query_trigrams & text_trigrams) / len(query_trigrams)
+
+
+@CharField.register_lookup
+class TrigramWordSimilar(Lookup):
+    """[title__trigram_word_similar=text compiles to pg_trgm's index supported %> operator]
+    """
+    lookup_name = 'trigram_word_similar'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        # %%%%> becomes %%> here, which the driver reads back as the %> operator when it interpolates params
+        return '%s %%%%> %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+class TrigramWordSimilarity(Func):
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+def intersect_posting_lists(posting_lists):
+    """[intersects ascending lists of note ids, probing the longer lists with binary search]
+
+    :param posting_lists: [mandatory]:[list]ascending lists of note ids
+    :return: ascending list of ids present in every list
+    """
+    if not posting_lists:
+        return []
+    posting_lists = sorted(posting_lists, key=len)
+    result = []
+    positions = [0] * len(posting_lists)
+    for note_id in posting_lists[0]:
+        for index, posting_list in enumerate(posting_lists[1:], start=1):
+            positions[index] = bisect.bisect_left(posting_list, note_id, positions[index])
+            if positions[index] == len(posting_list):
+                return result
+            if posting_list[positions[index]] != note_id:
+                break
+        else:
+            result.append(note_id)
+    return result
+
+
+class BaseSearchBackend:
+    """[interface implemented by every note search backend]
+    """
+
+    def install(self, connection):
+        """[creates database objects needed by backend, e.g. vendor specific indexes kept out of model Meta so
+            migrations are the same on every database, called after migrate]
+        """
+
+    def index_notes(self, note_ids):
+        """[brings index up to date with current title and description of given notes]
+        """
+
+    def remove_notes(self, note_ids):
+        """[drops given notes from index]
+        """
+
+    def access_changed(self, note_ids=None, account_ids=None):
+        """[reacts to collaborators being granted or revoked access to notes]
+
+        :param note_ids: [optional]:[list]ids of notes whose readers changed, None if all notes of accounts
+        :param account_ids: [optional]:[list]ids of accounts whose access changed
+        """
+
+    def suggest(self, user_id, queryset, text, limit):
+        """[finds titles most similar to partially typed text, tolerating typos.
+            Compares trigrams in python while streaming only id and title of visible notes]
+
+        :param user_id: [mandatory]:[int]id of the requesting user
+        :param queryset: [mandatory]:notes visible to requesting user
+        :param text: [mandatory]:[string]text typed so far
+        :param limit: [mandatory]:[int]maximum number of suggestions
+        :return: list of dictionaries with id and title of notes
+        """
+        typed = trigrams(text)
+        scored = ((word_similarity(typed, trigrams(title)), note_id, title)
+                  for note_id, title in queryset.values_list('id', 'title').iterator())
+        best = heapq.nlargest(limit, (row for row in scored if row[0] >= WORD_SIMILARITY_THRESHOLD))
+        return [{'id': note_id, 'title': title} for similarity, note_id, title in best]
+
+    def search(self, user_id, queryset, terms):
+        """[filters queryset down to notes matching every term, best match first]
+
+        :param user_id: [mandatory]:[int]id of the requesting user
+        :param queryset: [mandatory]:notes visible to requesting user
+        :param terms: [mandatory]:[list]tokens of search query
+        :return: queryset of matching notes
+        """
+        raise NotImplementedError
+
+
+class ContainsSearchBackend(BaseSearchBackend):
+    """[matches every term as a substring of title or description. Needs no index but scans every visible note]
+    """
+
+    def search(self, user_id, queryset, terms):
+        search_query = Q()
+        for term in terms:
+            search_query &= Q(title__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(search_query).order_by('-updated_at')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """[matches term prefixes against a weighted tsvector (title A, description B) kept in Note.search_vector
+        with a GIN index, ranking by ts_rank. Its GIN indexes are created by install, only on PostgreSQL]
+    """
+    config = 'english'
+
+    def install(self, connection):
+        if connection.vendor != 'postgresql':
+            return
+        table = connection.ops.quote_name(Note._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE INDEX IF NOT EXISTS note_search_vector_idx ON {} USING gin (search_vector)'.format(table))
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute('CREATE INDEX IF NOT EXISTS note_title_trgm_idx ON {} USING gin (title gin_trgm_ops)'.format(table))
+
+    def index_notes(self, note_ids):
+        Note.objects.filter(id__in=note_ids).update(
+            search_vector=SearchVector('title', weight='A', config=self.config) +
+                          SearchVector('description', weight='B', config=self.config))
+
+    def search(self, user_id, queryset, terms):
+        query = SearchQuery(' & '.join(term + ':*' for term in terms), search_type='raw', config=self.config)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)).order_by('-rank', '-updated_at')
+
+    def suggest(self, user_id, queryset, text, limit):
+        notes = queryset.filter(title__trigram_word_similar=text).annotate(
+            similarity=TrigramWordSimilarity(Value(text), F('title'))).order_by('-similarity', '-updated_at')
+        return list(notes.values('id', 'title')[:limit])
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """[matches term prefixes with an FTS5 table mirroring title and description, ranking by bm25 with
+        title weighted above description. Used by test settings so search is testable locally]
+    """
+    table = 'notes_note_fts'
+    weights = (10.0, 1.0)
+
+    def install(self, connection):
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5(title, description)'.format(self.table))
+
+    def index_notes(self, note_ids):
+        placeholders = ', '.join(['%s'] * len(note_ids))
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE rowid IN ({})'.format(self.table, placeholders), list(note_ids))
+            cursor.execute('INSERT INTO {} (rowid, title, description) SELECT id, title, description FROM {} '
+                           'WHERE id IN ({})'.format(self.table, Note._meta.db_table, placeholders), list(note_ids))
+
+    def remove_notes(self, note_ids):
+        placeholders = ', '.join(['%s'] * len(note_ids))
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE rowid IN ({})'.format(self.table, placeholders), list(note_ids))
+
+    def search(self, user_id, queryset, terms):
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM {table} WHERE {table} MATCH %s AND rowid IN '
+                           '(SELECT note_id FROM {access} WHERE account_id = %s) '
+                           'ORDER BY bm25({table}, %s, %s)'.format(table=self.table,
+                                                                    access=NoteAccess._meta.db_table),
+                           [match, user_id, *self.weights])
+            note_ids = [row[0] for row in cursor.fetchall()]
+        return order_by_ids(queryset, note_ids)
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """[keeps a per-user inverted index (token -> sorted posting list of note ids) in redis so all workers share it.
+        A user's index is built on their first search, updated incrementally on note writes and rebuilt from
+        scratch once it expires after INDEX_TIMEOUT, bounding the life of postings left stale by any race.
+        Terms match token prefixes through a per-user vocabulary and multi-term queries intersect posting lists]
+    """
+
+    def __init__(self):
+        self.redis = Cache.getInstance().cache
+
+    @staticmethod
+    def built_key(user_id):
+        return Cache.getInstance().make_key('SEARCH_USER_{}_BUILT'.format(user_id))
+
+    @staticmethod
+    def vocabulary_key(user_id):
+        return Cache.getInstance().make_key('SEARCH_USER_{}_VOCABULARY'.format(user_id))
+
+    @staticmethod
+    def posting_key(user_id, token):
+        return Cache.getInstance().make_key('SEARCH_USER_{}_TERM_{}'.format(user_id, token))
+
+    @staticmethod
+    def tokens_key(note_id):
+        return Cache.getInstance().make_key('SEARCH_NOTE_{}_TOKENS'.format(note_id))
+
+    @staticmethod
+    def readers_key(note_id):
+        return Cache.getInstance().make_key('SEARCH_NOTE_{}_READERS'.format(note_id))
+
+    def build(self, user_id):
+        """[indexes every note visible to user, unless another worker is building the index already.
+            The building marker is set before notes are read, so index_notes keeps applying writes to this user
+            meanwhile. Notes written while the snapshot was read are indexed again once it is stored]
+
+        :param user_id: [mandatory]:[int]id of user whose index is built
+        :return: True if index was built
+        """
+        started = timezone.now() - CLOCK_SKEW
+        if not self.redis.set(self.built_key(user_id), BUILDING, nx=True, ex=BUILD_TIMEOUT):
+            return False
+        stale = self.redis.zrange(self.vocabulary_key(user_id), 0, -1)
+        if stale:
+            self.redis.delete(self.vocabulary_key(user_id),
+                              *[self.posting_key(user_id, token.decode('utf-8')) for token in stale])
+        postings = defaultdict(list)
+        pipe = self.redis.pipeline()
+        notes = Note.objects.visible_to(user_id).order_by('id').values_list('id', 'title', 'description')
+        for note_id, title, description in notes.iterator():
+            tokens = set(tokenize(title + ' ' + description))
+            for token in tokens:
+                postings[token].append(note_id)
+            if tokens:
+                pipe.sadd(self.tokens_key(note_id), *tokens)
+            pipe.sadd(self.readers_key(note_id), user_id)
+        for token, note_ids in postings.items():
+            pipe.zadd(self.posting_key(user_id, token), {note_id: note_id for note_id in note_ids})
+        if postings:
+            pipe.zadd(self.vocabulary_key(user_id), {token: 0 for token in postings})
+        pipe.execute()
+        changed = list(Note.objects.visible_to(user_id).filter(updated_at__gte=started).values_list('id', flat=True))
+        if changed:
+            self.index_notes(changed)
+        self.redis.set(self.built_key(user_id), 1, ex=INDEX_TIMEOUT)
+        return True
+
+    def indexed_state(self, note_ids):
+        """[reads tokens and readers currently indexed for given notes]
+
+        :return: list of (tokens, readers) tuples in order of note_ids
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for note_id in note_ids:
+            pipe.smembers(self.tokens_key(note_id))
+            pipe.smembers(self.readers_key(note_id))
+        replies = pipe.execute()
+        return [({token.decode('utf-8') for token in replies[index]}, {int(reader) for reader in replies[index + 1]})
+                for index in range(0, len(replies), 2)]
+
+    def remove_postings(self, pipe, note_id, tokens, readers):
+        for reader in readers:
+            for token in tokens:
+                pipe.zrem(self.posting_key(reader, token), note_id)
+
+    def index_notes(self, note_ids):
+        note_ids = list(note_ids)
+        readers = defaultdict(set)
+        for note_id, account_id in NoteAccess.objects.filter(note_id__in=note_ids).values_list('note_id', 'account_id'):
+            readers[note_id].add(account_id)
+        accounts = sorted(set().union(*readers.values()))
+        pipe = self.redis.pipeline(transaction=False)
+        for account_id in accounts:
+            pipe.exists(self.built_key(account_id))
+        built = {account_id for account_id, exists in zip(accounts, pipe.execute()) if exists}
+
+        notes = Note.objects.filter(id__in=note_ids).values_list('id', 'title', 'description')
+        indexed = dict(zip(note_ids, self.indexed_state(note_ids)))
+        pipe = self.redis.pipeline()
+        for note_id, title, description in notes:
+            self.remove_postings(pipe, note_id, *indexed[note_id])
+            pipe.delete(self.tokens_key(note_id), self.readers_key(note_id))
+            tokens = set(tokenize(title + ' ' + description))
+            note_readers = readers[note_id] & built
+            if tokens:
+                pipe.sadd(self.tokens_key(note_id), *tokens)
+            if note_readers:
+                pipe.sadd(self.readers_key(note_id), *note_readers)
+            for reader in note_readers:
+                for token in tokens:
+                    pipe.zadd(self.posting_key(reader, token), {note_id: note_id})
+                if tokens:
+                    pipe.zadd(self.vocabulary_key(reader), {token: 0 for token in tokens})
+        pipe.execute()
+
+    def remove_notes(self, note_ids):
+        note_ids = list(note_ids)
+        pipe = self.redis.pipeline()
+        for note_id, (tokens, readers) in zip(note_ids, self.indexed_state(note_ids)):
+            self.remove_postings(pipe, note_id, tokens, readers)
+            pipe.delete(self.tokens_key(note_id), self.readers_key(note_id))
+        pipe.execute()
+
+    def access_changed(self, note_ids=None, account_ids=None):
+        if note_ids is not None:
+            self.index_notes(note_ids)
+        elif account_ids:
+            self.redis.delete(*[self.built_key(account_id) for account_id in account_ids])    # rebuilt on next search
+
+    def search(self, user_id, queryset, terms):
+        built = self.redis.get(self.built_key(user_id))
+        if built == BUILDING or built is None and not self.build(user_id):
+            return ContainsSearchBackend().search(user_id, queryset, terms)       # another worker is building
+
+        pipe = self.redis.pipeline(transaction=False)
+        for term in terms:
+            prefix = term.encode('utf-8')
+            pipe.zrangebylex(self.vocabulary_key(user_id), b'[' + prefix, b'[' + prefix + b'\xff')
+        expansions = [[token.decode('utf-8') for token in tokens] for tokens in pipe.execute()]
+
+        pipe = self.redis.pipeline(transaction=False)
+        for tokens in expansions:
+            for token in tokens:
+                pipe.zrange(self.posting_key(user_id, token), 0, -1)
+        replies = iter(pipe.execute())
+
+        posting_lists = []
+        for tokens in expansions:
+            merged = [[int(note_id) for note_id in next(replies)] for token in tokens]
+            posting_lists.append(sorted(set(heapq.merge(*merged))))
+
+        note_ids = intersect_posting_lists(posting_lists)
+        return queryset.filter(id__in=note_ids).order_by('-updated_at')
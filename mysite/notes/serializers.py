@@ -8,7 +8,108 @@ from accountmanagement.serializers import UserDetailsSerializer
 class NoteSerializer(serializers.ModelSerializer):  
     class Meta:
         model = Note
-        fields = '__all__'
-        
-    
-    
\ No newline at end of file
+        exclude = ['search_vector']
+
+
+class ExpandedNoteSerializer(NoteSerializer):
+    """[adds label names and collaborator emails next to their ids.
+        Resolved from prefetched relations when notes come from Note.objects.with_relations()]
+    """
+    label_names = serializers.SlugRelatedField(source='labels', slug_field='name', many=True, read_only=True)
+    collaborator_emails = serializers.SlugRelatedField(source='collaborators', slug_field='email', many=True,
+                                                       read_only=True)
+
+
+class BatchNoteSerializer(NoteSerializer):
+    """[validates plain note fields of batch operations, relations are resolved by the batch in bulk]
+    """
+    class Meta(NoteSerializer.Meta):
+        exclude = ['search_vector', 'user', 'collaborators', 'labels', 'image']
+
+
+class FastNoteSerializer:
+    """[read only serializer producing exactly the output of NoteSerializer (or ExpandedNoteSerializer) from
+        .values() rows and one query per many to many relation, bypassing per field DRF machinery]
+    """
+    datetime_field = serializers.DateTimeField()
+    relations = {                                       # output name: (relation, ordering column, value column)
+        'labels': ('labels', 'label_id', 'label_id'),
+        'collaborators': ('collaborators', 'account_id', 'account_id'),
+        'label_names': ('labels', 'label_id', 'label__name'),
+        'collaborator_emails': ('collaborators', 'account_id', 'account__email'),
+    }
+    plans = {}
+
+    def __init__(self, rows, expand=False):
+        """[collects related values of all rows]
+
+        :param rows: [mandatory]:[list]dictionaries read with FastNoteSerializer.values(queryset)
+        :param expand: [optional]:[boolean]True to add label names and collaborator emails
+        """
+        self.rows = rows
+        self.plan = self.get_plan(expand)
+        self.related = {}
+        note_ids = [row['id'] for row in rows]
+        for name, kind, column in self.plan:
+            if kind == 'related':
+                self.related[name] = self.related_values(note_ids, *self.relations[name])
+
+    @classmethod
+    def get_plan(cls, expand):
+        """[lists (output name, kind, column) in the field order of the equivalent DRF serializer]
+        """
+        if expand not in cls.plans:
+            plan = []
+            for name in (ExpandedNoteSerializer if expand else NoteSerializer)().fields:
+                if name in cls.relations:
+                    plan.append((name, 'related', None))
+                    continue
+                model_field = Note._meta.get_field(name)
+                if model_field.many_to_one:
+                    plan.append((name, 'plain', model_field.attname))
+                elif model_field.get_internal_type() == 'DateTimeField':
+                    plan.append((name, 'datetime', name))
+                elif model_field.get_internal_type() in ('FileField', 'ImageField'):
+                    plan.append((name, 'file', name))
+                else:
+                    plan.append((name, 'plain', name))
+            cls.plans[expand] = plan
+        return cls.plans[expand]
+
+    @classmethod
+    def values(cls, queryset, expand=False):
+        """[restricts queryset to columns needed for serialization]
+
+        :return: queryset of dictionaries
+        """
+        return queryset.values(*[column for name, kind, column in cls.get_plan(expand) if column])
+
+    @staticmethod
+    def related_values(note_ids, relation, ordering, column):
+        """[reads related values of all notes in one query, ordered like the prefetched relations]
+
+        :return: dictionary mapping note id to list of values
+        """
+        related = {note_id: [] for note_id in note_ids}
+        through = getattr(Note, relation).through
+        for note_id, value in through.objects.filter(note_id__in=note_ids).order_by(
+                'note_id', ordering).values_list('note_id', column):
+            related[note_id].append(value)
+        return related
+
+    def to_representation(self, row):
+        note = {}
+        for name, kind, column in self.plan:
+            if kind == 'plain':
+                note[name] = row[column]
+            elif kind == 'datetime':
+                note[name] = self.datetime_field.to_representation(row[column])
+            elif kind == 'file':
+                note[name] = Note._meta.get_field(column).storage.url(row[column]) if row[column] else None
+            else:
+                note[name] = self.related[name][row['id']]
+        return note
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
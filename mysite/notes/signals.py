@@ -0,0 +1,223 @@
+"""
+Overview: contains signal receivers keeping data derived from notes in sync with note writes
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import threading
+from contextlib import contextmanager
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from accountmanagement.models import Account
+from labels.models import Label
+from services.cache import Cache
+from .models import Note, NoteAccess
+from . import access, generations, search, sync, utils
+
+notes_bulk_changed = Signal()     # sent with note_ids and previous_access after bulk queries bypassing model signals
+notes_bulk_deleted = Signal()     # sent with note_ids and previous_access after notes were deleted with bulk queries
+
+_bulk = threading.local()
+
+
+@contextmanager
+def bulk_delete():
+    """[silences per note delete receivers while notes are deleted in bulk, the caller sends notes_bulk_deleted instead]
+    """
+    _bulk.deleting = True
+    try:
+        yield
+    finally:
+        _bulk.deleting = False
+
+
+def bulk_deleting():
+    return getattr(_bulk, 'deleting', False)
+
+
+@receiver(post_save, sender=Note)
+def sync_owner_access(sender, instance, created, raw=False, **kwargs):
+    """[keeps owner row of NoteAccess in sync on note create/update, raw saves (batch inserts) manage their own rows]
+    """
+    if raw:
+        return
+    access.sync_owner_access(instance, created=created)
+
+
+@receiver(m2m_changed, sender=Note.collaborators.through)
+def sync_collaborator_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """[keeps collaborator rows of NoteAccess in sync when collaborators are added, removed or cleared]
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        note_ids, account_ids = (list(pk_set) if pk_set is not None else None), [instance.id]
+    else:
+        note_ids, account_ids = [instance.id], (list(pk_set) if pk_set is not None else None)
+
+    if action == 'post_add':
+        access.grant_collaborator_access([(note_id, account_id) for note_id in note_ids for account_id in account_ids])
+    else:
+        access.revoke_collaborator_access(note_ids=note_ids, account_ids=account_ids)
+    search.get_search_backend().access_changed(note_ids=note_ids, account_ids=account_ids)
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, raw=False, **kwargs):
+    """[updates search index with saved title and description]
+    """
+    if raw:
+        return
+    search.get_search_backend().index_notes([instance.id])
+
+
+@receiver(post_delete, sender=Note)
+def unindex_note(sender, instance, **kwargs):
+    """[drops deleted note from search index]
+    """
+    if bulk_deleting():
+        return
+    search.get_search_backend().remove_notes([instance.id])
+
+
+@receiver(post_migrate)
+def install_search_backend(sender, using, **kwargs):
+    """[creates database objects needed by configured search backend once notes app is migrated]
+    """
+    if sender.name == 'notes':
+        search.get_search_backend().install(connections[using])
+
+
+def access_pairs(note_ids):
+    """[lists (note id, account id) of every account having access to any of the notes]
+    """
+    return set(NoteAccess.objects.filter(note_id__in=note_ids).values_list('note_id', 'account_id'))
+
+
+def readers(note_ids):
+    """[lists accounts having access to any of the notes]
+    """
+    return {account_id for note_id, account_id in access_pairs(note_ids)}
+
+
+def bump_on_commit(kind, user_ids):
+    """[advances generations once the current transaction commits, so a client can never be handed
+        the new generation along with the old collection]
+    """
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: generations.bump_generations(kind, user_ids))
+
+
+def drop_cached_notes(note_ids):
+    """[deletes records cached for any user from the notes after commit, in one round trip]
+    """
+    tags = [utils.note_tag(note_id) for note_id in set(note_ids)]
+    transaction.on_commit(lambda: Cache.getInstance().invalidate_tags(tags))
+
+
+def notes_changed(previous, current):
+    """[publishes changes of notes to every account that could see them before or can see them now.
+        Accounts that lost access get a tombstone. Cached copies of the notes are dropped for everyone]
+
+    :param previous: [mandatory]:[set](note id, account id) pairs before the change
+    :param current: [mandatory]:[set](note id, account id) pairs after the change
+    """
+    sync.record_changes(current, deleted=previous - current)
+    bump_on_commit(generations.NOTES, {account_id for note_id, account_id in previous | current})
+    drop_cached_notes({note_id for note_id, account_id in previous | current})
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, raw=False, **kwargs):
+    """[publishes saved note to every account it is visible to]
+    """
+    if raw:
+        return
+    notes_changed(set(), access_pairs([instance.id]))
+
+
+@receiver(pre_delete, sender=Note)
+def note_deleting(sender, instance, **kwargs):
+    """[remembers accounts the note is visible to before its NoteAccess rows are cascaded]
+    """
+    if bulk_deleting():
+        return
+    instance._access_pairs = access_pairs([instance.id])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    if bulk_deleting():
+        return
+    notes_changed(getattr(instance, '_access_pairs', set()), set())
+
+
+def changed_note_ids(sender, instance, reverse, pk_set):
+    """[lists notes whose collaborators or labels are being changed by an m2m operation]
+    """
+    if not reverse:
+        return [instance.id]
+    if pk_set is not None:
+        return list(pk_set)
+    column = 'account_id' if sender is Note.collaborators.through else 'label_id'
+    return list(sender.objects.filter(**{column: instance.id}).values_list('note_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Note.collaborators.through)
+@receiver(m2m_changed, sender=Note.labels.through)
+def note_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """[publishes notes whose collaborators or labels changed to accounts seeing them before or after the change]
+    """
+    if action.startswith('pre_'):
+        instance._changed_note_ids = changed_note_ids(sender, instance, reverse, pk_set)
+        instance._previous_access_pairs = access_pairs(instance._changed_note_ids)
+        return
+    notes_changed(instance._previous_access_pairs, access_pairs(instance._changed_note_ids))
+
+
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+def label_changed(sender, instance, created=False, **kwargs):
+    """[changes label list of the owner and, when a label is renamed or deleted, note lists showing it]
+    """
+    bump_on_commit(generations.LABELS, [instance.user_id])
+    if not created:
+        bump_on_commit(generations.NOTES, readers(Note.labels.through.objects.filter(
+            label_id=instance.id).values('note_id')))
+
+
+@receiver(notes_bulk_changed, sender=Note)
+def bulk_notes_changed(sender, note_ids, previous_access, **kwargs):
+    """[updates listing state of access rows, search index, change log, generations and cached notes after notes
+        were written with bulk queries]
+    """
+    access.sync_listing_state(note_ids)
+    search.get_search_backend().index_notes(note_ids)
+    current_access = access_pairs(note_ids)
+    notes_changed(previous_access, current_access)
+
+
+@receiver(notes_bulk_deleted, sender=Note)
+def bulk_notes_deleted(sender, note_ids, previous_access, **kwargs):
+    """[drops notes deleted with bulk queries from search index, publishes tombstones and drops cached notes]
+    """
+    search.get_search_backend().remove_notes(note_ids)
+    notes_changed(previous_access, set())
+
+
+@receiver(pre_save, sender=Account)
+def account_saving(sender, instance, update_fields=None, **kwargs):
+    """[remembers stored email of an account about to be saved, in case it changes]
+    """
+    if instance.pk and (update_fields is None or 'email' in update_fields):
+        instance._stored_email = Account.objects.filter(pk=instance.pk).values_list('email', flat=True).first()
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def account_changed(sender, instance, **kwargs):
+    """[drops cached account ids of the previous and current email of a saved or deleted account]
+    """
+    emails = [getattr(instance, '_stored_email', None), instance.email]
+    transaction.on_commit(lambda: utils.forget_account_emails(emails))
@@ -0,0 +1,109 @@
+"""
+Overview: contains change log of notes per account and sync tokens used by delta sync api
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import base64
+from django.db import transaction
+from django.db.models import Q
+from exceptions.exceptions import CustomError, ExceptionType
+from .models import NoteChange, SyncCounter
+
+
+def encode_token(seq, after_id=None):
+    """[encodes sync sequence of an account as an opaque token]
+
+    :param seq: [mandatory]:[int]sequence the client is synced up to
+    :param after_id: [optional]:[int]id of the last note sent while the initial sync is still being paged
+    :return: urlsafe token string
+    """
+    position = 's{}'.format(seq) if after_id is None else 'i{}.{}'.format(seq, after_id)
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('utf-8').rstrip('=')
+
+
+def decode_position(token):
+    """[decodes sync token received from client]
+
+    :param token: [optional]:[string]token returned by previous sync
+    :return: (sequence, id of last note sent) tuple, id is None once the initial sync is complete,
+             (None, None) for initial sync
+    """
+    if not token:
+        return None, None
+    try:
+        position = base64.urlsafe_b64decode((token + '=' * (-len(token) % 4)).encode('utf-8')).decode('utf-8')
+        if position.startswith('s'):
+            seq, after_id = int(position[1:]), None
+        elif position.startswith('i'):
+            seq, after_id = (int(value) for value in position[1:].split('.'))
+            if after_id < 0:
+                raise ValueError(token)
+        else:
+            raise ValueError(token)
+        if seq < 0:
+            raise ValueError(token)
+        return seq, after_id
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise CustomError(ExceptionType.ValidationError, "Invalid sync token")
+
+
+def decode_token(token):
+    """[decodes sync token received from client]
+
+    :param token: [optional]:[string]token returned by previous sync
+    :return: sequence the client is synced up to, None for initial sync
+    """
+    return decode_position(token)[0]
+
+
+def current_seq(account_id):
+    """[reads last sequence handed out to account]
+
+    :return: sequence, 0 if account has no changes recorded yet
+    """
+    return SyncCounter.objects.filter(account_id=account_id).values_list('value', flat=True).first() or 0
+
+
+def record_changes(changed, deleted=()):
+    """[records latest change of notes for accounts under fresh per account sequences.
+        Counter rows of every account are locked in one pass in account order, so concurrent writers cannot
+        deadlock, and stay locked until the surrounding transaction commits, so a client can never
+        sync past a sequence whose change is not committed yet]
+
+    :param changed: [mandatory]:[iterable](note id, account id) tuples of notes changed for those accounts
+    :param deleted: [optional]:[iterable](note id, account id) tuples of notes deleted or unshared for those accounts
+    :return: -
+    """
+    states = dict.fromkeys(changed, False)
+    states.update(dict.fromkeys(deleted, True))
+    pairs = sorted(states, key=lambda pair: (pair[1], pair[0]))
+    if not pairs:
+        return
+    account_ids = sorted({account_id for note_id, account_id in pairs})
+    with transaction.atomic():
+        SyncCounter.objects.bulk_create([SyncCounter(account_id=account_id) for account_id in account_ids],
+                                        ignore_conflicts=True)
+        counters = {counter.account_id: counter for counter in
+                    SyncCounter.objects.select_for_update().filter(account_id__in=account_ids).order_by('account_id')}
+        changes = []
+        for note_id, account_id in pairs:
+            counters[account_id].value += 1
+            changes.append(NoteChange(account_id=account_id, note_id=note_id, seq=counters[account_id].value,
+                                      deleted=states[note_id, account_id]))
+        SyncCounter.objects.bulk_update(counters.values(), ['value'])
+        replaced = Q()
+        for account_id in account_ids:
+            replaced |= Q(account_id=account_id, note_id__in=[note_id for note_id, pair_account in pairs
+                                                              if pair_account == account_id])
+        NoteChange.objects.filter(replaced).delete()
+        NoteChange.objects.bulk_create(changes)
+
+
+def changes_since(account_id, seq, limit):
+    """[reads changes of account after a sequence in the order they were made]
+
+    :return: (list of changes, True if more changes follow)
+    """
+    changes = list(NoteChange.objects.filter(account_id=account_id, seq__gt=seq).order_by('seq')[:limit + 1])
+    return changes[:limit], len(changes) > limit
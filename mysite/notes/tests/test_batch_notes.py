@@ -0,0 +1,103 @@
+import datetime
+import pytest
+from django.utils import timezone
+from exceptions.exceptions import CustomError
+from mixer.backend.django import mixer
+from notes.batch import NoteBatch, purge_notes, transition_notes
+from notes.models import Note, NoteAccess, NoteChange
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def owner():
+    return mixer.blend('accountmanagement.Account')
+
+
+class TestNoteBatch:
+    def test_batch_is_applied_in_bulk(self, owner, django_assert_max_num_queries):
+        collaborator = mixer.blend('accountmanagement.Account', email='friend@example.com')
+        label = mixer.blend('labels.Label', user=owner, name='work')
+        edited = mixer.blend('notes.Note', user=owner, title='old title')
+        removed = mixer.blend('notes.Note', user=owner)
+        operations = [{'op': 'create', 'data': {'title': 'note {}'.format(index), 'description': 'imported',
+                                                'labels': ['work'], 'collaborators': ['friend@example.com']}}
+                      for index in range(20)]
+        operations += [{'op': 'update', 'id': edited.id, 'data': {'title': 'new title', 'labels': ['work']}},
+                       {'op': 'delete', 'id': removed.id}]
+
+        with django_assert_max_num_queries(30):
+            applied, results = NoteBatch(owner.id, operations).apply()
+        assert applied and all(result['status'] for result in results)
+        assert results[0]['note']['labels'] == [label.id]
+        assert results[0]['note']['collaborators'] == [collaborator.id]
+        assert Note.objects.visible_to(collaborator.id).count() == 20
+        assert Note.objects.get(id=edited.id).title == 'new title'
+        assert Note.objects.get(id=removed.id).is_trashed
+        assert NoteAccess.objects.filter(note_id=results[0]['id'], role=NoteAccess.OWNER, account=owner).exists()
+        assert NoteChange.objects.filter(account=collaborator).count() == 20
+
+    def test_invalid_operation_rejects_whole_batch(self, owner):
+        stranger_note = mixer.blend('notes.Note', user=mixer.blend('accountmanagement.Account'))
+        operations = [{'op': 'create', 'data': {'title': 'kept out', 'description': 'x', 'labels': ['missing']}},
+                      {'op': 'delete', 'id': stranger_note.id},
+                      {'op': 'archive', 'id': 1}]
+        applied, results = NoteBatch(owner.id, operations).apply()
+        assert not applied
+        assert [result['status'] for result in results] == [False, False, False]
+        assert not Note.objects.filter(title='kept out').exists()
+        assert not Note.objects.get(id=stranger_note.id).is_trashed
+
+
+    def test_relations_must_be_lists_of_names(self, owner):
+        operations = [{'op': 'create', 'data': {'title': 't', 'description': 'd', 'labels': 'work'}},
+                      {'op': 'create', 'data': {'title': 't', 'description': 'd', 'labels': ['work'],
+                                                'collaborators': [{'email': 'a@b.c'}]}},
+                      {'op': 'create', 'data': {'title': 't', 'description': 'd', 'labels': ['work'],
+                                                'collaborators': 7}}]
+        applied, results = NoteBatch(owner.id, operations).apply()
+        assert not applied
+        assert [result['message'] for result in results] == ["labels should be a list of label names",
+                                                             "collaborators should be a list of emails",
+                                                             "collaborators should be a list of emails"]
+
+
+class TestNoteTransitions:
+    def test_transition_reports_unchanged_and_skipped_notes(self, owner, django_assert_max_num_queries):
+        notes = mixer.cycle(3).blend('notes.Note', user=owner, is_archived=False, is_trashed=False)
+        archived = mixer.blend('notes.Note', user=owner, is_archived=True, is_trashed=False)
+        trashed = mixer.blend('notes.Note', user=owner, is_trashed=True)
+        foreign = mixer.blend('notes.Note', user=mixer.blend('accountmanagement.Account'))
+        note_ids = [note.id for note in notes] + [archived.id, trashed.id, foreign.id]
+
+        with django_assert_max_num_queries(10):
+            outcome = transition_notes(owner.id, 'archive', note_ids)
+        assert outcome == {'updated': [note.id for note in notes], 'unchanged': [archived.id],
+                           'skipped': [trashed.id, foreign.id]}
+        assert Note.objects.filter(id__in=note_ids, is_archived=True).count() == 4
+
+        assert transition_notes(owner.id, 'restore', [trashed.id, notes[0].id])['updated'] == [trashed.id]
+
+
+    def test_transition_accepts_more_notes_than_a_batch(self, owner, settings):
+        notes = mixer.cycle(settings.MAX_BATCH_OPERATIONS + 50).blend('notes.Note', user=owner, is_archived=False,
+                                                                     is_trashed=False)
+        outcome = transition_notes(owner.id, 'archive', [note.id for note in notes])
+        assert len(outcome['updated']) == settings.MAX_BATCH_OPERATIONS + 50
+        with pytest.raises(CustomError):
+            transition_notes(owner.id, 'archive', list(range(1, settings.MAX_BULK_STATE_IDS + 2)))
+
+class TestNotePurge:
+    def test_only_notes_trashed_before_retention_are_purged(self, owner):
+        collaborator = mixer.blend('accountmanagement.Account')
+        expired = mixer.blend('notes.Note', user=owner, is_trashed=True)
+        expired.collaborators.add(collaborator)
+        recent = mixer.blend('notes.Note', user=owner, is_trashed=True)
+        active = mixer.blend('notes.Note', user=owner, is_trashed=False)
+        trashed_before = timezone.now() - datetime.timedelta(days=30)
+        Note.objects.filter(id__in=[expired.id, active.id]).update(updated_at=trashed_before - datetime.timedelta(days=1))
+
+        purged = purge_notes([expired.id, recent.id, active.id], trashed_before)
+        assert [note_id for note_id, image in purged] == [expired.id]
+        assert list(Note.objects.filter(user=owner).order_by('id')) == [recent, active]
+        assert not NoteAccess.objects.filter(note_id=expired.id).exists()
+        assert NoteChange.objects.get(account=collaborator, note_id=expired.id).deleted
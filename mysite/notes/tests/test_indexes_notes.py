@@ -0,0 +1,68 @@
+import datetime
+import re
+import pytest
+from django.db import connection
+from django.utils import timezone
+from mixer.backend.django import mixer
+from notes import access
+from notes.models import Note, NoteAccess
+from notes.pagination import NOTE_ORDERING
+pytestmark = pytest.mark.django_db
+
+ACCESS_INDEXES = ('unique_note_access', 'note_access_listing_idx', 'note_access_archived_idx',
+                  'note_access_pinned_idx')
+SORT = re.compile(r'TEMP B-TREE FOR ORDER BY|\bSort\b')
+
+
+@pytest.fixture
+def seeded_user():
+    """
+    this fixture seeds notes of several users in all states and returns id of one of the users
+    """
+    users = mixer.cycle(4).blend('accountmanagement.Account')
+    now = timezone.now()
+    Note.objects.bulk_create([Note(user=users[i % 4], title='note {}'.format(i), description='seeded note',
+                                   is_pinned=i % 7 == 0, is_archived=i % 5 == 0, is_trashed=i % 11 == 0,
+                                   reminder=now + datetime.timedelta(minutes=i) if i % 13 == 0 else None)
+                              for i in range(2000)])
+    access.rebuild_access(list(Note.objects.values_list('id', flat=True)))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return users[0].id
+
+
+def assert_uses_index(queryset, *names, ordered=False):
+    """
+    asserts the plan of queryset reads through one of the named indexes and, for listings, takes its order from it
+    """
+    plan = queryset.explain()
+    assert any(name in plan for name in names), plan
+    if ordered:
+        assert not SORT.search(plan), plan
+
+
+class TestNoteIndexes:
+    def test_note_list_and_detail_use_index(self, seeded_user):
+        assert_uses_index(Note.objects.visible_to(seeded_user).active().order_by(*NOTE_ORDERING)[:11],
+                          'note_access_listing_idx', ordered=True)
+        assert_uses_index(Note.objects.visible_to(seeded_user).active().filter(id=1), *ACCESS_INDEXES)
+
+    def test_archived_notes_use_index(self, seeded_user):
+        assert_uses_index(Note.objects.visible_to(seeded_user).archived().order_by(*NOTE_ORDERING)[:11],
+                          'note_access_archived_idx', 'note_access_listing_idx', ordered=True)
+        assert_uses_index(Note.objects.visible_to(seeded_user).archived().filter(id=1), *ACCESS_INDEXES)
+
+    def test_pinned_notes_use_index(self, seeded_user):
+        assert_uses_index(Note.objects.visible_to(seeded_user).pinned().order_by(*NOTE_ORDERING)[:11],
+                          'note_access_pinned_idx', 'note_access_listing_idx', ordered=True)
+        assert_uses_index(Note.objects.visible_to(seeded_user).pinned().filter(id=1), *ACCESS_INDEXES)
+
+    def test_trashed_notes_use_index(self, seeded_user):
+        notes = Note.objects.visible_to(seeded_user, role=NoteAccess.OWNER).trashed()
+        assert_uses_index(notes.order_by(*NOTE_ORDERING)[:11], 'note_access_listing_idx', ordered=True)
+        assert_uses_index(notes.filter(id=1), *ACCESS_INDEXES)
+
+    def test_check_reminder_uses_index(self, seeded_user):
+        now = timezone.now()
+        assert_uses_index(Note.objects.with_reminder_between(now, now + datetime.timedelta(hours=1)),
+                          'note_reminder_idx')
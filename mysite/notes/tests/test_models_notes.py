@@ -1,5 +1,7 @@
 import pytest
 from mixer.backend.django import mixer
+from notes import access, sync
+from notes.models import Note, NoteAccess, NoteChange
 pytestmark = pytest.mark.django_db
 
 class TestNotes:
@@ -11,4 +13,72 @@ class TestNotes:
     def test_note_is_soft_deleted(self):
         note_obj = mixer.blend('notes.Note',is_trashed = False)
         note_obj.soft_delete()
-        assert note_obj.is_trashed == True
\ No newline at end of file
+        assert note_obj.is_trashed == True
+
+
+class TestNoteAccess:
+    def test_access_follows_owner_and_collaborators(self):
+        owner = mixer.blend('accountmanagement.Account')
+        collaborator = mixer.blend('accountmanagement.Account')
+        note_obj = mixer.blend('notes.Note', user=owner)
+        note_obj.collaborators.add(owner, collaborator)
+        assert set(NoteAccess.objects.filter(note=note_obj).values_list('account_id', 'role')) == {
+            (owner.id, NoteAccess.OWNER), (collaborator.id, NoteAccess.COLLABORATOR)}
+        assert list(Note.objects.visible_to(owner.id)) == [note_obj]
+
+        note_obj.collaborators.remove(owner, collaborator)
+        assert list(Note.objects.visible_to(owner.id)) == [note_obj]
+        assert not Note.objects.visible_to(collaborator.id).exists()
+
+    def test_inconsistent_access_is_found_and_rebuilt(self):
+        owner = mixer.blend('accountmanagement.Account')
+        collaborator = mixer.blend('accountmanagement.Account')
+        note_obj = mixer.blend('notes.Note', user=owner)
+        note_obj.collaborators.add(collaborator)
+        NoteAccess.objects.filter(account=collaborator).delete()
+
+        missing, unexpected = access.find_inconsistencies([note_obj.id])
+        assert missing == [(note_obj.id, collaborator.id, NoteAccess.COLLABORATOR)]
+        assert unexpected == []
+
+        access.rebuild_access([note_obj.id])
+        assert access.find_inconsistencies([note_obj.id]) == ([], [])
+
+
+class TestNoteChanges:
+    def test_changes_get_increasing_sequences_and_tombstones(self):
+        owner = mixer.blend('accountmanagement.Account')
+        collaborator = mixer.blend('accountmanagement.Account')
+        first = mixer.blend('notes.Note', user=owner)
+        second = mixer.blend('notes.Note', user=owner)
+        first.collaborators.add(collaborator)
+        since = sync.current_seq(owner.id)
+
+        second.title = 'edited'
+        second.save()
+        first.collaborators.remove(collaborator)
+        changes, has_more = sync.changes_since(owner.id, since, 10)
+        assert [change.note_id for change in changes] == [second.id, first.id]
+        assert changes[0].seq < changes[1].seq and not has_more
+        assert NoteChange.objects.get(account=collaborator, note_id=first.id).deleted
+
+        first.delete()
+        changes, has_more = sync.changes_since(owner.id, since, 1)
+        assert has_more and changes[0].note_id == second.id
+        assert NoteChange.objects.get(account=owner, note_id=first.id).deleted
+
+    def test_changes_and_tombstones_lock_counters_once(self, django_assert_max_num_queries):
+        kept, unshared = mixer.cycle(2).blend('accountmanagement.Account')
+        note = mixer.blend('notes.Note', user=kept)
+        with django_assert_max_num_queries(10) as context:
+            sync.record_changes({(note.id, kept.id)}, deleted={(note.id, unshared.id)})
+        assert sum(query['sql'].startswith('SELECT') and 'synccounter' in query['sql']
+                   for query in context.captured_queries) == 1
+        assert not NoteChange.objects.get(account=kept, note_id=note.id).deleted
+        assert NoteChange.objects.get(account=unshared, note_id=note.id).deleted
+
+    def test_sync_token_round_trip(self):
+        assert sync.decode_token(sync.encode_token(42)) == 42
+        assert sync.decode_token('') is None
+        assert sync.decode_position(sync.encode_token(42, 7)) == (42, 7)
+        assert sync.decode_position(sync.encode_token(42)) == (42, None)
@@ -0,0 +1,105 @@
+import pytest
+from mixer.backend.django import mixer
+from notes import search
+from notes.models import Note
+pytestmark = pytest.mark.django_db
+
+
+class TestSearchBackend:
+    def test_tokenize(self):
+        assert search.tokenize("Shopping-list: milk & Eggs") == ['shopping', 'list', 'milk', 'eggs']
+        assert search.tokenize(None) == []
+
+    def test_search_matches_prefixes_and_ranks_title_first(self):
+        owner = mixer.blend('accountmanagement.Account')
+        stranger = mixer.blend('accountmanagement.Account')
+        in_description = mixer.blend('notes.Note', user=owner, title='groceries', description='remember the milk')
+        in_title = mixer.blend('notes.Note', user=owner, title='milk run', description='before noon')
+        mixer.blend('notes.Note', user=stranger, title='milk', description='not shared')
+
+        backend = search.get_search_backend()
+        notes = backend.search(owner.id, Note.objects.visible_to(owner.id), search.tokenize('mil'))
+        assert list(notes) == [in_title, in_description]
+
+        notes = backend.search(owner.id, Note.objects.visible_to(owner.id), search.tokenize('milk noon'))
+        assert list(notes) == [in_title]
+
+    def test_deleted_note_is_removed_from_index(self):
+        owner = mixer.blend('accountmanagement.Account')
+        note_obj = mixer.blend('notes.Note', user=owner, title='temporary', description='note')
+        note_obj.delete()
+        backend = search.get_search_backend()
+        assert not backend.search(owner.id, Note.objects.visible_to(owner.id), ['temporary']).exists()
+
+
+class TestInvertedIndex:
+    def test_intersect_posting_lists(self):
+        assert search.intersect_posting_lists([[1, 3, 5, 9], [3, 4, 5, 9, 12], [0, 5, 9]]) == [5, 9]
+        assert search.intersect_posting_lists([[1, 2], []]) == []
+        assert search.intersect_posting_lists([]) == []
+
+    def test_inverted_index_follows_note_writes(self):
+        owner = mixer.blend('accountmanagement.Account')
+        collaborator = mixer.blend('accountmanagement.Account')
+        backend = search.InvertedIndexSearchBackend()
+        note_obj = mixer.blend('notes.Note', user=owner, title='weekly groceries', description='milk and eggs')
+
+        assert list(backend.search(owner.id, Note.objects.visible_to(owner.id), ['gro', 'milk'])) == [note_obj]
+
+        note_obj.description = 'bread'
+        note_obj.save()
+        backend.index_notes([note_obj.id])
+        assert not backend.search(owner.id, Note.objects.visible_to(owner.id), ['milk']).exists()
+
+        note_obj.collaborators.add(collaborator)
+        assert list(backend.search(collaborator.id, Note.objects.visible_to(collaborator.id), ['bread'])) == [note_obj]
+
+    def test_writes_during_build_are_indexed(self):
+        owner = mixer.blend('accountmanagement.Account')
+        backend = search.InvertedIndexSearchBackend()
+        backend.redis.set(backend.built_key(owner.id), search.BUILDING)
+        note_obj = mixer.blend('notes.Note', user=owner, title='draft', description='written while building')
+        backend.index_notes([note_obj.id])
+        assert backend.redis.zscore(backend.posting_key(owner.id, 'draft'), note_obj.id) is not None
+        assert list(backend.search(owner.id, Note.objects.visible_to(owner.id), ['draft'])) == [note_obj]
+        backend.redis.delete(backend.built_key(owner.id))
+
+
+class TestSuggestions:
+    def test_trigram_word_similarity(self):
+        assert search.trigrams('Go') == {'  g', ' go', 'go '}
+        assert search.word_similarity(search.trigrams('groc'), search.trigrams('Weekly groceries')) == 0.8
+        assert search.word_similarity(search.trigrams(''), search.trigrams('groceries')) == 0.0
+
+    def test_trigram_lookup_survives_parameter_interpolation(self):
+        sql, params = Note.objects.filter(title__trigram_word_similar='groc').query.sql_with_params()
+        interpolated = sql % tuple("'{}'".format(param) for param in params)
+        assert interpolated.endswith('"title" %> \'groc\'')
+
+    def test_suggest_tolerates_typos(self):
+        owner = mixer.blend('accountmanagement.Account')
+        groceries = mixer.blend('notes.Note', user=owner, title='Weekly groceries')
+        mixer.blend('notes.Note', user=owner, title='Meeting agenda')
+        backend = search.get_search_backend()
+        assert backend.suggest(owner.id, Note.objects.visible_to(owner.id), 'grocres', 5) == [
+            {'id': groceries.id, 'title': 'Weekly groceries'}]
+
+
+class TestRanking:
+    def test_highlight_marks_matches_and_escapes_text(self):
+        assert search.highlight('Buy milk & eggs, then milking', ['milk']) == \
+            'Buy <b>milk</b> &amp; eggs, then <b>milking</b>'
+        snippet = search.highlight('x ' * 200 + 'the milk' + ' y' * 200, ['milk'])
+        assert snippet.startswith('...') and snippet.endswith('...')
+        assert '<b>milk</b>' in snippet
+
+    def test_rank_notes_keeps_best_matches(self):
+        owner = mixer.blend('accountmanagement.Account')
+        in_description = mixer.blend('notes.Note', user=owner, title='groceries', description='milk')
+        in_title = mixer.blend('notes.Note', user=owner, title='milk', description='two litres')
+        mixer.blend('notes.Note', user=owner, title='chores', description='buy more milk, milk powder')
+
+        ranked = search.rank_notes(Note.objects.visible_to(owner.id), ['milk'], 2)
+        assert len(ranked) == 2
+        assert ranked[0].note_id == in_title.id
+        assert in_description.id not in [note.note_id for note in ranked]
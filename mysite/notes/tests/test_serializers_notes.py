@@ -0,0 +1,71 @@
+import io
+import json
+import pytest
+from mixer.backend.django import mixer
+from notes.models import Note
+from notes.serializers import ExpandedNoteSerializer, FastNoteSerializer, NoteSerializer
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from services.codec import Codec
+from services.renderers import FastJSONParser, FastJSONRenderer
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def owner():
+    """
+    this fixture creates an owner with notes having labels and collaborators
+    """
+    owner = mixer.blend('accountmanagement.Account')
+    for index in range(5):
+        note_obj = mixer.blend('notes.Note', user=owner)
+        note_obj.labels.add(mixer.blend('labels.Label', user=owner))
+        note_obj.collaborators.add(*mixer.cycle(2).blend('accountmanagement.Account'))
+    return owner
+
+
+class TestNoteSerializers:
+    def test_list_serialization_takes_constant_queries(self, owner, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            data = NoteSerializer(Note.objects.visible_to(owner.id).with_relations(), many=True).data
+        assert len(data) == 5
+        assert all(len(note['collaborators']) == 2 for note in data)
+
+    def test_expanded_serialization_takes_constant_queries(self, owner, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            data = ExpandedNoteSerializer(Note.objects.visible_to(owner.id).with_relations(), many=True).data
+        note = data[0]
+        assert note['label_names'] == [Note.objects.get(id=note['id']).labels.get().name]
+        assert len(note['collaborator_emails']) == 2
+
+    def test_fast_serializer_matches_drf_serializers(self, owner, django_assert_num_queries):
+        notes = Note.objects.visible_to(owner.id).order_by('id')
+        for expand, serializer_class, queries in ((False, NoteSerializer, 2), (True, ExpandedNoteSerializer, 4)):
+            rows = list(FastNoteSerializer.values(notes, expand))
+            with django_assert_num_queries(queries):
+                fast_data = FastNoteSerializer(rows, expand).data
+            assert json.dumps(fast_data) == json.dumps(serializer_class(notes.with_relations(), many=True).data)
+
+
+class TestJSONRendering:
+    def test_fast_renderer_and_parser_match_drf(self, owner):
+        data = {'status': True, 'message': 'retrieved successfully',
+                'data': NoteSerializer(Note.objects.visible_to(owner.id).with_relations(), many=True).data}
+        content = FastJSONRenderer().render(data)
+        assert json.loads(content) == json.loads(JSONRenderer().render(data))
+        assert FastJSONParser().parse(io.BytesIO(content)) == JSONParser().parse(io.BytesIO(content))
+
+
+class TestCacheCodec:
+    @pytest.mark.parametrize('codec', [Codec(), Codec(use_msgpack=False), Codec(compress_threshold=0)])
+    def test_cached_notes_round_trip(self, owner, codec):
+        details = [NoteSerializer(note).data for note in Note.objects.visible_to(owner.id).with_relations()]
+        page = {'data': FastNoteSerializer(list(FastNoteSerializer.values(Note.objects.visible_to(owner.id)))).data,
+                'next': None}
+        assert [Codec.decode(codec.encode(data)) for data in details] == details
+        assert Codec.decode(codec.encode(page)) == page
+
+    def test_legacy_and_foreign_values(self):
+        assert Codec.decode(b'token') == b'token'
+        assert Codec.decode(bytes([0x0f]) + Codec().encode('value')[1:]) is None
+
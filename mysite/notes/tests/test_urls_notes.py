@@ -71,3 +71,32 @@ class TestNoteUrls:
         """
         path = reverse("searched-notes")
         assert resolve(path).view_name == "searched-notes"
+
+
+    def test_note_suggest_url(self):
+        """
+        this method will test url and matches result with view name as suggest
+        """
+        path = reverse("suggested-notes")
+        assert resolve(path).view_name == "suggested-notes"
+
+    def test_note_changes_url(self):
+        """
+        this method will test url and matches result with view name as note changes
+        """
+        path = reverse("note-changes")
+        assert resolve(path).view_name == "note-changes"
+
+    def test_batch_notes_url(self):
+        """
+        this method will test url and matches result with view name as batch notes
+        """
+        path = reverse("batch-notes")
+        assert resolve(path).view_name == "batch-notes"
+
+    def test_bulk_note_state_url(self):
+        """
+        this method will test url and matches result with view name as bulk note state
+        """
+        path = reverse("bulk-note-state", args=['archive'])
+        assert resolve(path).view_name == "bulk-note-state"
@@ -0,0 +1,46 @@
+import pytest
+from mixer.backend.django import mixer
+from notes import utils
+from services.cache import Cache
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class TestAccountResolution:
+    def test_emails_are_resolved_in_one_query_then_from_cache(self, django_assert_num_queries):
+        first, second = mixer.cycle(2).blend('accountmanagement.Account')
+        utils.forget_account_emails([first.email, second.email, 'nobody@example.com'])
+        with django_assert_num_queries(1):
+            account_ids = utils.resolve_account_ids([first.email, second.email, 'nobody@example.com'])
+        assert account_ids == {first.email: first.id, second.email: second.id}
+        with django_assert_num_queries(0):
+            assert utils.resolve_account_ids([first.email, second.email]) == account_ids
+
+    def test_each_email_expires_on_its_own(self):
+        first, second = mixer.cycle(2).blend('accountmanagement.Account')
+        cache = Cache.getInstance()
+        utils.resolve_account_ids([first.email])
+        cache.cache.expire(cache.make_key(utils.ACCOUNT_ID_KEY.format(first.email)), 5)
+        utils.resolve_account_ids([first.email, second.email])
+        assert 0 < cache.cache.ttl(cache.make_key(utils.ACCOUNT_ID_KEY.format(first.email))) <= 5
+        assert cache.cache.ttl(cache.make_key(utils.ACCOUNT_ID_KEY.format(second.email))) > 5
+
+    def test_changed_email_is_forgotten(self):
+        account = mixer.blend('accountmanagement.Account', email='old@example.com')
+        assert utils.resolve_account_ids(['old@example.com']) == {'old@example.com': account.id}
+        account.email = 'new@example.com'
+        account.save()
+        assert utils.resolve_account_ids(['old@example.com', 'new@example.com']) == {'new@example.com': account.id}
+
+
+class TestLabelResolution:
+    def test_label_map_is_cached_until_labels_change(self, django_assert_num_queries):
+        owner = mixer.blend('accountmanagement.Account')
+        work = mixer.blend('labels.Label', user=owner, name='work')
+        mixer.blend('labels.Label', user=mixer.blend('accountmanagement.Account'), name='foreign')
+        assert utils.get_label_ids(owner.id) == {'work': work.id}
+        with django_assert_num_queries(0):
+            assert utils.get_label_ids(owner.id) == {'work': work.id}
+
+        home = mixer.blend('labels.Label', user=owner, name='home')
+        work.soft_delete()
+        assert utils.get_label_ids(owner.id) == {'home': home.id}
@@ -2,8 +2,10 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 import pytest
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
+from notes.utils import note_tag
+from services.cache import Cache
 
 User = get_user_model()
 
@@ -284,37 +286,287 @@ class TrashViewTest(Data):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class FilteredListViewTest(Data):
+    """
+    Test case for validating filters of note listing.
+    """
+
+    def test_note_list_filters(self):
+        """
+        Test case for combining listing filters in a single request.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        self.client.post(self.label_url, self.valid_label_data, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, self.valid_note_data, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, dict(self.valid_note_data2, is_archived=False, is_pinned=False),
+                    HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, self.valid_trashed_note_data, HTTP_AUTHORIZATION=headers, format='json')
+
+        response = client.get(self.note_post_url + "?pinned=true&archived=true", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([note['title'] for note in response.data['data']], [self.valid_note_data['title']])
 
+        response = client.get(self.note_post_url + "?pinned=false&label=First Note", HTTP_AUTHORIZATION=headers,
+                              format='json')
+        self.assertEqual([note['title'] for note in response.data['data']], [self.valid_note_data2['title']])
 
+        response = client.get(self.note_post_url + "?trashed=true", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual([note['title'] for note in response.data['data']], [self.valid_trashed_note_data['title']])
 
+        response = client.get(self.note_post_url + "?has_reminder=true", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.data['data'], [])
 
+        response = client.get(self.note_post_url + "?pinned=maybe", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class PaginationViewTest(Data):
+    """
+    Test case for validating cursor pagination of note listings.
+    """
 
+    def test_note_list_is_paginated_with_cursor(self):
+        """
+        Test case for following next cursor through all pages of notes.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        self.client.post(self.label_url, self.valid_label_data, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, self.valid_note_data, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, self.valid_note_data2, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, dict(self.valid_note_data2, title="test note 3"), HTTP_AUTHORIZATION=headers,
+                    format='json')
 
+        response = client.get(self.note_post_url + "?limit=2", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 2)
+        self.assertIsNotNone(response.data['next'])
+        first_page_ids = [note['id'] for note in response.data['data']]
 
+        response = client.get(self.note_post_url + "?limit=2&cursor=" + response.data['next'],
+                              HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertNotIn(response.data['data'][0]['id'], first_page_ids)
 
+    def test_note_list_with_invalid_cursor(self):
+        """
+        Test case for rejecting tampered cursor and invalid limit.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
 
+        response = client.get(self.note_post_url + "?cursor=not-a-cursor", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+        response = client.get(self.note_post_url + "?limit=-1", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class NoteChangesViewTest(Data):
+    """
+    Test case for validating initial and delta sync of notes.
+    """
 
+    def test_initial_sync_is_paged_and_followed_by_delta_sync(self):
+        """
+        Test case for paging the initial sync and receiving notes created meanwhile through the delta sync.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        self.client.post(self.label_url, self.valid_label_data, HTTP_AUTHORIZATION=headers, format='json')
+        for title in ("test note 1", "test note 2", "test note 3"):
+            client.post(self.note_post_url, dict(self.valid_note_data2, title=title), HTTP_AUTHORIZATION=headers,
+                        format='json')
+        changes_url = reverse("note-changes")
 
+        response = client.get(changes_url + "?limit=2", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']['changed']), 2)
+        self.assertTrue(response.data['data']['has_more'])
+        first_page_ids = [note['id'] for note in response.data['data']['changed']]
+
+        client.post(self.note_post_url, dict(self.valid_note_data2, title="test note 4"), HTTP_AUTHORIZATION=headers,
+                    format='json')
+        response = client.get(changes_url + "?limit=2&since=" + response.data['next'], HTTP_AUTHORIZATION=headers,
+                              format='json')
+        second_page_ids = [note['id'] for note in response.data['data']['changed']]
+        self.assertEqual(len(second_page_ids), 2)
+        self.assertFalse(response.data['data']['has_more'])
+        self.assertLess(max(first_page_ids), min(second_page_ids))
+
+        response = client.get(changes_url + "?since=" + response.data['next'], HTTP_AUTHORIZATION=headers,
+                              format='json')
+        self.assertEqual([note['title'] for note in response.data['data']['changed']], ["test note 4"])
+        self.assertEqual(response.data['data']['deleted'], [])
+
+        response = client.get(changes_url + "?since=not-a-token", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class ConditionalListViewTest(TransactionTestCase):
+    """
+    Test case for validating ETag based conditional requests and cached pages of note listings.
+    Runs without a wrapping transaction, as list generations are bumped once writes commit.
+    """
+    setUp = Data.setUp
 
+    def test_unchanged_note_list_is_not_modified(self):
+        """
+        Test case for answering 304 until the note list of the user changes.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        self.client.post(self.label_url, self.valid_label_data, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, self.valid_note_data, HTTP_AUTHORIZATION=headers, format='json')
 
+        response = client.get(self.note_post_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
 
+        response = client.get(self.note_post_url, HTTP_AUTHORIZATION=headers, HTTP_IF_NONE_MATCH=etag, format='json')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
 
+        response = client.get(self.note_pinned_url, HTTP_AUTHORIZATION=headers, HTTP_IF_NONE_MATCH=etag,
+                              format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+        client.post(self.note_post_url, self.valid_note_data2, HTTP_AUTHORIZATION=headers, format='json')
+        response = client.get(self.note_post_url, HTTP_AUTHORIZATION=headers, HTTP_IF_NONE_MATCH=etag, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
 
+    def test_note_list_page_is_cached_until_notes_change(self):
+        """
+        Test case for serving repeated note list requests from cache until a note of the user is written.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        self.client.post(self.label_url, self.valid_label_data, HTTP_AUTHORIZATION=headers, format='json')
+        client.post(self.note_post_url, self.valid_note_data, HTTP_AUTHORIZATION=headers, format='json')
 
+        response = client.get(self.note_post_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(len(response.data['data']), 1)
+        with self.assertNumQueries(0):
+            cached = client.get(self.note_post_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(cached.data['data'], response.data['data'])
 
+        client.post(self.note_post_url, self.valid_note_data2, HTTP_AUTHORIZATION=headers, format='json')
+        response = client.get(self.note_post_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(len(response.data['data']), 2)
 
+    def test_expired_note_detail_is_rebuilt_by_one_worker(self):
+        """
+        Test case for serving a stale note detail while another worker holds the lock rebuilding it.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        client.post(self.note_post_url, self.valid_note_data, HTTP_AUTHORIZATION=headers, format='json')
+        note_url = reverse('manage-specific', args=[user.author.get().id])
+        response = client.get(note_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+        cache = Cache.getInstance()
+        key = "USER_" + str(user.id) + "_NOTE_" + str(response.data['data']['id']) + "_DETAIL"
+        cache.set(key, {'value': response.data['data'], 'delta': 0, 'expiry': 0})
+        cache.cache.set(cache.make_key(key + '_LOCK'), 'other worker', ex=10)
+        with self.assertNumQueries(0):
+            stale = client.get(note_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(stale.data['data'], response.data['data'])
 
+        cache.cache.delete(cache.make_key(key + '_LOCK'))
+        client.get(note_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertGreater(cache.get(key)['expiry'], 0)
 
+    def test_expanded_note_detail_is_not_served_from_plain_cache(self):
+        """
+        Test case for returning label names and collaborator emails of a note detail when expand is requested.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        client.post(self.note_post_url, {'title': "shared note", 'description': "shared with myself",
+                                         'collaborators': ["anamfazal94@gmail.com"]},
+                    HTTP_AUTHORIZATION=headers, format='json')
+        note_url = reverse('manage-specific', args=[user.author.get().id])
 
+        response = client.get(note_url, HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('collaborator_emails', response.data['data'])
 
+        response = client.get(note_url + "?expand=true", HTTP_AUTHORIZATION=headers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['collaborator_emails'], ["anamfazal94@gmail.com"])
 
+    def test_note_write_drops_cached_copies_of_every_user(self):
+        """
+        Test case for invalidating the cached detail of a note for every user through its tag.
+        """
+        client = APIClient()
+        self.client.post(self.register_url, self.valid_registration_data, format='json')
+        user = User.objects.filter(email=self.valid_registration_data['email']).first()
+        user.is_verified = True
+        user.is_active = True
+        user.save()
+        response = self.client.post(self.login_url, self.valid_login_data, format='json')
+        headers = response.__getitem__(header="HTTP_AUTHORIZATION")
+        client.post(self.note_post_url, self.valid_note_data, HTTP_AUTHORIZATION=headers, format='json')
+        note = user.author.get()
+
+        cache = Cache.getInstance()
+        keys = ["USER_" + str(user_id) + "_NOTE_" + str(note.id) + "_DETAIL" for user_id in (user.id, user.id + 1)]
+        for key in keys:
+            cache.set_computed(key, {'id': note.id}, tags=[note_tag(note.id)])
+        note.title = 'changed title'
+        note.save()
+        self.assertEqual(cache.get_many(keys), {})
 
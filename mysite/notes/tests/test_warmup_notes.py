@@ -0,0 +1,29 @@
+import pytest
+from mixer.backend.django import mixer
+from notes import generations
+from notes.warmup import warm_user_cache
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def owner():
+    """
+    this fixture creates an owner with labels, notes and a pinned note, none of them cached yet
+    """
+    owner = mixer.blend('accountmanagement.Account')
+    mixer.cycle(2).blend('labels.Label', user=owner)
+    mixer.cycle(3).blend('notes.Note', user=owner, is_pinned=False, is_trashed=False, is_archived=False)
+    mixer.blend('notes.Note', user=owner, is_pinned=True, is_trashed=False, is_archived=False)
+    generations.bump_generations(generations.NOTES, [owner.id])
+    generations.bump_generations(generations.LABELS, [owner.id])
+    return owner
+
+
+class TestCacheWarmUp:
+    def test_first_screen_is_cached(self, owner, django_assert_num_queries):
+        assert warm_user_cache(owner.id, 20) > 0
+        with django_assert_num_queries(0):
+            assert warm_user_cache(owner.id, 20) == 0
+
+    def test_warm_up_stays_within_budget(self, owner):
+        assert warm_user_cache(owner.id, 1) == 1
@@ -5,6 +5,10 @@ urlpatterns = [
     path('', views.NotesOverview.as_view()),
 
     path('notes/search/',views.SearchNote.as_view(),name = 'searched-notes'),
+    path('notes/suggest/',views.SuggestNote.as_view(),name = 'suggested-notes'),
+    path('notes/changes/',views.NoteChanges.as_view(),name = 'note-changes'),
+    path('notes/batch/',views.BatchNotes.as_view(),name = 'batch-notes'),
+    path('notes/bulk/<str:action>/',views.BulkNoteState.as_view(),name = 'bulk-note-state'),
 
     path('notes/archived/',views.ManageArchivedNote.as_view(),name = 'archived-notes'),
     path('note/archived/<int:pk>/',views.ManageArchivedNote.as_view(),name = 'manage-specific-archived'),
@@ -5,10 +5,12 @@ Created on: Dec 18, 2020
 """
 import logging
 import os
+import redis
 from labels.models import Label
-from rest_framework import status
-from rest_framework.response import Response
 from accountmanagement.models import Account
+from exceptions.exceptions import CustomError, ExceptionType
+from services.cache import Cache
+from . import generations
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -34,48 +36,119 @@ def set_user(request,user_id):
     request.POST._mutable = False
 
 
+ACCOUNT_ID_KEY = "ACCOUNT_ID_{}"                       # redis key of account id of an email, shared by all users
+
+
+def resolve_account_ids(emails):
+    """[maps emails to account ids, from per email cache records first and one email__in query for the rest]
+
+    :param emails: [mandatory]:[list]emails of accounts
+    :return: dictionary mapping each existing email to its account id
+    """
+    emails = list(dict.fromkeys(emails))
+    if not emails:
+        return {}
+    cache = Cache.getInstance()
+    try:
+        cached = cache.get_many([ACCOUNT_ID_KEY.format(email) for email in emails])
+    except redis.RedisError as e:
+        logger.error('could not read cached account ids: {}'.format(e))
+        cached = {}
+    account_ids = {email: cached[ACCOUNT_ID_KEY.format(email)] for email in emails
+                   if ACCOUNT_ID_KEY.format(email) in cached}
+
+    missing = [email for email in emails if email not in account_ids]
+    if missing:
+        found = dict(Account.objects.filter(email__in=missing).values_list('email', 'id'))
+        if found:
+            try:
+                cache.set_many({ACCOUNT_ID_KEY.format(email): account_id for email, account_id in found.items()})
+            except redis.RedisError as e:
+                logger.error('could not cache account ids: {}'.format(e))
+        account_ids.update(found)
+    return account_ids
+
+
+def forget_account_emails(emails):
+    """[drops cached account ids of emails, called when accounts change]
+
+    :param emails: [mandatory]:[list]emails whose mapping may be stale
+    :return: -
+    """
+    emails = [email for email in emails if email]
+    if emails:
+        try:
+            Cache.getInstance().delete_many([ACCOUNT_ID_KEY.format(email) for email in emails])
+        except redis.RedisError as e:
+            logger.error('could not drop cached account ids of {}: {}'.format(emails, e))
+
+
 def get_collaborator_list(request):
     """[maps collaborator emails to their user ids and modifies request.data]
 
     :param request: [optional]:[string]collaborator email(s)
     :return: -
+    Raises:
+        CustomError: [if collaborators is not a list or any email does not belong to an account]
     """
-    try:
-        request.POST._mutable = True
-        collaborators_list=[]                                           #holds ids associated to label names
-        for collaborator_email in request.data.get('collaborators'):
-            collab_qs = Account.objects.filter(email=collaborator_email)
-            if not collab_qs:
-                raise Account.DoesNotExist('No such user account exists')
-            if collab_qs.exists() and collab_qs.count() == 1:
-                collab_obj = collab_qs.first()                         #assign object from queryset
-                collaborators_list.append(collab_obj.id)               # append object id of the obtained object to list
-        request.data["collaborators"] = collaborators_list
-        request.POST._mutable = False
-    except Account.DoesNotExist as e:
-        result = manage_response(status=False, message='account not found', log=str(e), logger_obj=logger)
-        return Response(result, status.HTTP_400_BAD_REQUEST,content_type="application/json")
-
-
-def get_label_list(request):
+    emails = request.data.get('collaborators')
+    if not isinstance(emails, list):
+        raise CustomError(ExceptionType.ValidationError, "collaborators should be a list of emails")
+    account_ids = resolve_account_ids(emails)
+    unknown = [email for email in dict.fromkeys(emails) if email not in account_ids]
+    if unknown:
+        raise CustomError(ExceptionType.NonExistentError,
+                          "No such user account exists: {}".format(', '.join(unknown)))
+    request.POST._mutable = True
+    request.data["collaborators"] = [account_ids[email] for email in emails]
+    request.POST._mutable = False
+
+
+def get_label_ids(user_id):
+    """[loads label name to id map of the user with one query and caches it under the user's label generation,
+        so the map is rebuilt only after a label of the user was created, renamed or deleted]
+
+    :param user_id: [mandatory]:[int]id of the user owning the labels
+    :return: dictionary mapping label names to ids
+    """
+    generation = generations.get_generation(generations.LABELS, user_id)
+    key = "USER_" + str(user_id) + "_LABEL_IDS_" + str(generation)
+    if generation is not None:
+        try:
+            cached = Cache.getInstance().get(key)
+            if isinstance(cached, dict):
+                return cached
+        except redis.RedisError as e:
+            logger.error('could not read cached label ids: {}'.format(e))
+    label_ids = dict(Label.objects.filter(user=user_id, is_deleted=False).values_list('name', 'id'))
+    if generation is not None:
+        try:
+            Cache.getInstance().set(key, label_ids)
+        except redis.RedisError as e:
+            logger.error('could not cache label ids: {}'.format(e))
+    return label_ids
+
+
+def get_label_list(request, user_id):
     """[maps label titles to their label ids and modifies request.data]
 
     :param request: [optional]:[string]label name(s)
+    :param user_id: [mandatory]:[int]id of the user owning the labels
     :return: -
-    """ 
+    Raises:
+        CustomError: [if labels is not a list or any name is not a label of the user]
+    """
+    names = request.data.get('labels')
+    if not isinstance(names, list):
+        raise CustomError(ExceptionType.ValidationError, "labels should be a list of label names")
+    label_ids = get_label_ids(user_id)
+    unknown = [name for name in dict.fromkeys(names) if name not in label_ids]
+    if unknown:
+        raise CustomError(ExceptionType.NonExistentError, "No such label exists: {}".format(', '.join(unknown)))
     request.POST._mutable = True
-    label_list=[]                                           #holds ids associated to label names
-    for label_name in request.data.get('labels'):
-        label_qs = Label.objects.filter(name=label_name)
-        if not label_qs:
-            raise Label.DoesNotExist('No such label exists')
-        if label_qs.exists() and label_qs.count() == 1:
-            label_obj = label_qs.first()                         #assign object from queryset 
-            label_list.append(label_obj.id)               # append object id of the obtained object to list
-    request.data["labels"] = label_list
+    request.data["labels"] = [label_ids[name] for name in names]
     request.POST._mutable = False
-    
-    
+
 
 def manage_response(**kwargs):
     """[prepares result dictionary to be sent as response]
@@ -85,6 +158,7 @@ def manage_response(**kwargs):
                                [string]log message
                                [object]logger object
                    [optional]:[dict] data for successful requests
+                              [string] cursor for next page of paginated requests
     :return: dictionary containing result
     """
     result = {}
@@ -96,6 +170,8 @@ def manage_response(**kwargs):
             result['data'] = kwargs['data']
         if 'header' in kwargs:
             result['header'] = kwargs['header']
+        if 'next' in kwargs:
+            result['next'] = kwargs['next']
         kwargs['logger_obj'].debug('validated data: {}'.format(kwargs['log']))
     else:
         kwargs['logger_obj'].error('error: {}'.format(kwargs['log']))
@@ -115,3 +191,9 @@ def manage_response(**kwargs):
 
 
 
+
+
+def note_tag(note_id):
+    """[builds cache tag of every record derived from a note, for any user]
+    """
+    return "NOTE_" + str(note_id)
@@ -6,15 +6,20 @@ Created on: Dec 15, 2020
 
 import logging
 import os
+import redis
+from django.conf import settings
 from django.db.models import Q
 from django.utils.decorators import method_decorator
 from accountmanagement.decorators import user_login_required
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from .serializers import NoteSerializer
-from .models import Note
-from . import utils
+from .serializers import ExpandedNoteSerializer, FastNoteSerializer, NoteSerializer
+from .models import Note, NoteAccess
+from .pagination import NoteCursorPagination
+from .batch import NoteBatch, transition_notes
+from .query import NoteQuery
+from . import generations, search, sync, utils
 from exceptions.exceptions import CustomError,ExceptionType
 from services.cache import Cache
 
@@ -32,6 +37,93 @@ logger.addHandler(file_handler)
 
 cache=Cache.getInstance()   #get initialised Cache instance from services.Cache
 
+
+def get_note(notes, pk):
+    """[fetches note from queryset in a single query]
+
+    :param notes: [mandatory]:queryset the note should belong to
+    :param pk: [mandatory]:[integer]id of the note
+    :return: note
+    """
+    try:
+        return notes.get(id=pk)
+    except Note.DoesNotExist:
+        raise CustomError(ExceptionType.NonExistentError, "Requested note does not exist")
+
+
+def is_expanded(request):
+    """[checks if representation with label names and collaborator emails is requested]
+
+    :param request: [optional]:[boolean]expand
+    :return: boolean
+    """
+    return NoteQuery.parse_boolean('expand', request.query_params.get('expand') or 'false')
+
+
+def get_serializer_class(request):
+    """[picks serializer of expanded or plain representation]
+
+    :param request: [optional]:[boolean]expand
+    :return: serializer class
+    """
+    return ExpandedNoteSerializer if is_expanded(request) else NoteSerializer
+
+
+def get_cached_page(key, compute):
+    """[reads a cached page of notes, letting a single worker compute it on a miss while others wait for it,
+        and computing it directly if the cache is unavailable]
+
+    :param key: [mandatory]:[string]cache key of the page
+    :param compute: [mandatory]:function returning dictionary with data and next of the page
+    :return: dictionary with data and next of the page
+    """
+    try:
+        return cache.get_or_set(key, compute, timeout=settings.NOTE_LIST_CACHE_TIMEOUT)
+    except redis.RedisError as e:
+        logger.error('could not read cached page {}: {}'.format(key, e))
+        return compute()
+
+
+def note_page(request, notes):
+    """[serializes the requested page of notes]
+
+    :return: dictionary with data and next of the page
+    """
+    expand = is_expanded(request)
+    paginator = NoteCursorPagination(request)
+    serializer = FastNoteSerializer(paginator.paginate_queryset(FastNoteSerializer.values(notes, expand)), expand)
+    return {'data': serializer.data, 'next': paginator.next_cursor}
+
+
+def note_list_response(request, user_id, notes, log):
+    """[serializes one page of notes into a response in a constant number of queries.
+        Responds 304 if the client's ETag is still current, or with the cached page if it was cached under the
+        user's current generation, in both cases without touching the database]
+
+    :param request: [optional]:[int]limit and [string]cursor of the page, [boolean]expand
+    :param user_id: [mandatory]:[int]id of the requesting user
+    :param notes: [mandatory]:queryset of notes to be listed
+    :param log: [mandatory]:[string]log message
+    :return: Response with notes of the page and cursor of next page
+    """
+    generation = generations.get_generation(generations.NOTES, user_id)
+    etag = generations.collection_etag(request, generations.NOTES, user_id, generation)
+    response = generations.not_modified(request, etag)
+    if response is not None:
+        return response
+
+    if etag:
+        page = get_cached_page(generations.collection_cache_key(request, generations.NOTES, user_id, generation),
+                               lambda: note_page(request, notes))
+    else:
+        page = note_page(request, notes)
+    result = utils.manage_response(status=True, message='retrieved successfully', data=page['data'],
+                                   next=page['next'], log=log, logger_obj=logger)
+    response = Response(result, status.HTTP_200_OK, content_type="application/json")
+    if etag is not None:
+        response['ETag'] = etag
+    return response
+
 class NotesOverview(APIView):
     """[displays a list of urls that can be used for different operations]
     """
@@ -57,34 +149,31 @@ class ManageNotes(APIView):
     def get(self,request,**kwargs):
         """ [displays all notes that requesting user is authorized to see]
 
-        :param request:none
+        :param request:[optional]:[boolean]expand: adds label names and collaborator emails
+                       [optional]:[int]limit: number of notes per page
+                       [optional]:[string]cursor: next cursor returned with previous page
+                       [optional]:[boolean]pinned, archived, trashed, has_reminder, shared: filters on note state
+                       [optional]:[string]label, color: filters on label name and note color
         :param pk: [optional]:[integer] id of the note to be retrieved
         :param kwargs:[mandatory]:[string]authentication token containing user id
-        :return:notes either owned by or of which the requesting user is a collaborator and status code
+        :return:notes either owned by or of which the requesting user is a collaborator, next cursor and status code
         """
         try:
             current_user = kwargs['userid']
             if kwargs.get('pk'):
-                if not Note.objects.filter(id=kwargs.get('pk')).exists():
-                    raise CustomError(ExceptionType.NonExistentError, "Requested note does not exist")
-
-                if cache.get("USER_"+str(current_user)+"_NOTE_"+str(kwargs.get('pk'))+"_DETAIL") is not None:
-                    note=cache.get("USER_"+str(current_user)+"_NOTE_"+str(kwargs.get('pk'))+"_DETAIL")
-                    result=utils.manage_response(status=True,message='retrieved successfully',data=note,log='retrieved specific note from cache',logger_obj=logger)
-                    return Response(result ,status.HTTP_200_OK ,content_type="application/json")
+                notes = Note.objects.visible_to(current_user).active()
+                if is_expanded(request):
+                    # label names and collaborator emails change without the note, so only the plain one is cached
+                    note = ExpandedNoteSerializer(get_note(notes, kwargs.get('pk'))).data
                 else:
-                    note = Note.objects.get(Q(id=kwargs.get('pk')), Q(is_trashed=False),
-                                            Q(user=current_user) | Q(collaborators=current_user))
-                    serializer = NoteSerializer(note)
-                    cache.set("USER_"+str(current_user)+"_NOTE_" + str(note.id) + "_DETAIL", str(serializer.data))
-
-
+                    note = cache.get_or_set("USER_"+str(current_user)+"_NOTE_"+str(kwargs.get('pk'))+"_DETAIL",
+                                            lambda: NoteSerializer(get_note(notes, kwargs.get('pk'))).data,
+                                            tags=[utils.note_tag(kwargs.get('pk'))])
+                result=utils.manage_response(status=True,message='retrieved successfully',data=note,log='retrieved specific note',logger_obj=logger)
+                return Response(result ,status.HTTP_200_OK ,content_type="application/json")
             else:
-                notes = Note.objects.filter(Q(user=current_user)|Q(collaborators=current_user)).exclude(is_trashed=True).distinct()
-                serializer = NoteSerializer(notes, many=True)
-
-            result=utils.manage_response(status=True,message='retrieved successfully',data=serializer.data,log='retrieved notes',logger_obj=logger)
-            return Response(result , status.HTTP_200_OK , content_type="application/json")
+                return note_list_response(request, current_user, NoteQuery(current_user, request.query_params).queryset(),
+                                          'retrieved notes')
 
         except CustomError as e:
             result = utils.manage_response(status=False, message=e.message, log=str(e),
@@ -115,7 +204,7 @@ class ManageNotes(APIView):
             if data.get('collaborators'):
                 utils.get_collaborator_list(request)
             if data.get('labels'):
-                utils.get_label_list(request)
+                utils.get_label_list(request, kwargs['userid'])
 
             serializer = NoteSerializer(data=request.data)
             if serializer.is_valid(raise_exception=True):               # Return a 400 response if the data was invalid.
@@ -150,7 +239,6 @@ class ManageNotes(APIView):
                             Q(user=current_user))
 
             note.soft_delete()
-            cache.delete("USER_"+str(current_user)+"_NOTE_"+str(note.id)+"_DETAIL")
             result=utils.manage_response(status=True,message='note deleted successfully',log=('deleted note with id: {}'.format(pk)),logger_obj=logger)
             return Response(result,status.HTTP_204_NO_CONTENT , content_type="application/json")
 
@@ -184,7 +272,7 @@ class ManageNotes(APIView):
             utils.get_collaborator_list(request)
             if not data.get('labels'):
                 raise CustomError(ExceptionType.MissingFieldError, "Please enter labels")
-            utils.get_label_list(request)
+            utils.get_label_list(request, kwargs['userid'])
 
             current_user=kwargs['userid']
             note = Note.objects.get(Q(id=pk),Q(is_trashed=False),
@@ -193,9 +281,8 @@ class ManageNotes(APIView):
             serializer = NoteSerializer(note, data=request.data)
             if serializer.is_valid(raise_exception=True):
                 serializer.save()
-                if cache.get("USER_"+str(current_user)+"_NOTE_" + str(note.id) + "_DETAIL"):
-                    cache.delete("USER_"+str(current_user)+"_NOTE_" + str(note.id) + "_DETAIL")
-                cache.set("USER_"+str(current_user)+"_NOTE_" + str(note.id) + "_DETAIL", str(serializer.data))
+                cache.set_computed("USER_"+str(current_user)+"_NOTE_" + str(note.id) + "_DETAIL", serializer.data,
+                                   tags=[utils.note_tag(note.id)])
             else:
                 raise CustomError(ExceptionType.ValidationError,"Please enter valid details")
 
@@ -229,16 +316,15 @@ class ManageNotes(APIView):
             if data.get('collaborators'):
                 utils.get_collaborator_list(request)
             if data.get('labels'):
-                utils.get_label_list(request)
+                utils.get_label_list(request, kwargs['userid'])
 
             current_user = kwargs['userid']
             note = Note.objects.get(Q(id=pk), Q(is_trashed=False),Q(user=current_user))
             serializer = NoteSerializer(note, data=request.data, partial=True)
             if serializer.is_valid(raise_exception=True):
                 serializer.save()
-                if cache.get("USER_" + str(current_user) + "_NOTE_" + str(note.id) + "_DETAIL"):
-                    cache.delete("USER_" + str(current_user) + "_NOTE_" + str(note.id) + "_DETAIL")
-                cache.set("USER_" + str(current_user) + "_NOTE_" + str(note.id) + "_DETAIL", str(serializer.data))
+                cache.set_computed("USER_" + str(current_user) + "_NOTE_" + str(note.id) + "_DETAIL", serializer.data,
+                                   tags=[utils.note_tag(note.id)])
             else:
                 raise CustomError(ExceptionType.ValidationError, "Please enter valid details")
             result = utils.manage_response(status=True, message='updated successfully', data=serializer.data,
@@ -276,18 +362,12 @@ class ManageArchivedNote(APIView):
         try:
             current_user = kwargs['userid']
             if kwargs.get('pk'):
-                if not Note.objects.filter(id=kwargs.get('pk')).exists():
-                    raise CustomError(ExceptionType.NonExistentError, "Requested note does not exist")
-
-                note = Note.objects.get(Q(id=kwargs.get('pk')),Q(is_archived=True),Q(is_trashed=False),
-                                        Q(user=current_user) | Q(collaborators=current_user))
-                serializer = NoteSerializer(note)
-
-
+                note = get_note(Note.objects.visible_to(current_user).archived(), kwargs.get('pk'))
+                serializer = get_serializer_class(request)(note)
 
             else:
-                notes = Note.objects.filter(Q(user=kwargs['userid'])|Q(collaborators=kwargs['userid'])).exclude(is_trashed=True).exclude(is_archived=False).distinct()
-                serializer = NoteSerializer(notes, many=True)
+                return note_list_response(request, current_user, NoteQuery(current_user, request.query_params, archived=True).queryset(),
+                                          'retrieved archived notes')
             
             result=utils.manage_response(status=True,message='retrieved successfully',data=serializer.data,log='retrieved archived note',logger_obj=logger)
             return Response(result , status.HTTP_200_OK ,content_type="application/json")
@@ -318,16 +398,12 @@ class ManagePinnedNotes(APIView):
         try:
             current_user = kwargs['userid']
             if kwargs.get('pk'):
-                if not Note.objects.filter(id=kwargs.get('pk')).exists():
-                    raise CustomError(ExceptionType.NonExistentError, "Requested note does not exist")
-
-                note = Note.objects.get(Q(id=kwargs.get('pk')),Q(is_trashed=False),Q(is_pinned=True),
-                            Q(user=current_user)|Q(collaborators=current_user))
-                serializer = NoteSerializer(note)
+                note = get_note(Note.objects.visible_to(current_user).pinned(), kwargs.get('pk'))
+                serializer = get_serializer_class(request)(note)
 
             else:
-                notes = Note.objects.filter(Q(user=kwargs['userid'])|Q(collaborators=kwargs['userid'])).exclude(is_trashed=True).exclude(is_pinned=False).distinct()
-                serializer = NoteSerializer(notes, many=True)
+                return note_list_response(request, current_user, NoteQuery(current_user, request.query_params, pinned=True).queryset(),
+                                          'retrieved pinned notes')
             
             result=utils.manage_response(status=True,message='retrieved successfully',data=serializer.data,log='retrieved pinned note',logger_obj=logger)
             return Response(result , status.HTTP_200_OK , content_type="application/json")
@@ -359,15 +435,12 @@ class ManageTrashedNotes(APIView):
         try:
             current_user = kwargs['userid']
             if kwargs.get('pk'):
-                if not Note.objects.filter(id=kwargs.get('pk')).exists():
-                    raise CustomError(ExceptionType.NonExistentError, "Requested note does not exist")
-
-                note = Note.objects.get(Q(id=kwargs.get('pk')),Q(is_trashed=True),Q(user=current_user))
-                serializer = NoteSerializer(note)
+                note = get_note(Note.objects.visible_to(current_user, role=NoteAccess.OWNER).trashed(), kwargs.get('pk'))
+                serializer = get_serializer_class(request)(note)
 
             else:
-                notes = Note.objects.filter(Q(user=kwargs['userid'])).exclude(is_trashed=False)
-                serializer = NoteSerializer(notes, many=True)
+                return note_list_response(request, current_user, NoteQuery(current_user, request.query_params, trashed=True).queryset(),
+                                          'retrieved trashed notes')
             
             result=utils.manage_response(status=True,message='retrieved successfully',data=serializer.data,log='retrieved trashed note',logger_obj=logger)
             return Response(result , status.HTTP_200_OK , content_type="application/json")
@@ -391,35 +464,43 @@ class SearchNote(APIView):
 
 
     def get(self, request, **kwargs):
-        """[shows all trashed notes or specific note if pk is passed]
+        """[shows best matching notes with highlighted snippets of their description]
 
-        :param request: [mandatory]:[string]search term containing part of title or description
+        :param request: [mandatory]:[string]q: search terms containing words or beginnings of words of title or description
+                        [optional]:[int]limit: number of notes to be returned
         :param kwargs: [mandatory]:[string]authentication token containing user id
         :return: matching notes either owned by or of which the requesting user is a collaborator and status code
         """
 
         try:
             current_user = kwargs['userid']
-            search_terms = request.query_params.get('q')
-            if search_terms is '':
+            search_term_list = search.tokenize(request.query_params.get('q'))
+            if not search_term_list:
                 raise CustomError(ExceptionType.ValidationError,"Please enter a search term")
-            search_term_list = search_terms.split(' ')
-
-            notes = Note.objects.filter(Q(user=current_user) | Q(collaborators=current_user)).exclude(
-                is_trashed=True)
-
-            search_query = Q(title__icontains=search_term_list[0]) | Q(description__icontains=search_term_list[0])
 
-            for term in search_term_list[1:]:
-                search_query.add((Q(title__icontains=term) | Q(description__icontains=term)), search_query.AND)
+            limit = NoteCursorPagination.get_limit(request.query_params.get('limit'))
 
-            notes = notes.filter(search_query)
-            serializer = NoteSerializer(notes, many=True)
-            if serializer.data == []:
+            notes = search.get_search_backend().search(current_user, Note.objects.visible_to(current_user).active(),
+                                                       search_term_list)
+            ranked_notes = search.rank_notes(notes, search_term_list, limit)
+            if not ranked_notes:
                 raise CustomError(ExceptionType.NonExistentError, "Search term didn't match any existing note.Please try again")
 
+            visible = Note.objects.visible_to(current_user).active()
+            rows = FastNoteSerializer.values(visible.filter(id__in=[ranked.note_id for ranked in ranked_notes]))
+            serialized = {note['id']: note for note in FastNoteSerializer(list(rows)).data}
+            results = []
+            for ranked in ranked_notes:
+                if ranked.note_id not in serialized:
+                    continue                                  # deleted or unshared since it was ranked
+                note = dict(serialized[ranked.note_id])
+                del note['description']
+                note['snippet'] = search.highlight(ranked.description, search_term_list)
+                note['score'] = round(ranked.score, 4)
+                results.append(note)
+
             result = utils.manage_response(status=True, message='retrieved notes on the basis of search terms',
-                                           data=serializer.data,
+                                           data=results,
                                            log='retrieved searched note', logger_obj=logger)
             return Response(result, status.HTTP_200_OK, content_type="application/json")
 
@@ -433,26 +514,161 @@ class SearchNote(APIView):
             return Response(result, status.HTTP_400_BAD_REQUEST,content_type="application/json")
 
 
+@method_decorator(user_login_required, name='dispatch')
+class SuggestNote(APIView):
+    """[suggests titles of notes similar to partially typed text, meant to be called on every keystroke]
+    """
 
+    def get(self, request, **kwargs):
+        """[returns top titles similar to typed text, tolerating typos]
 
+        :param request: [mandatory]:[string]q: text typed so far, at least two characters
+                        [optional]:[int]limit: number of suggestions
+        :param kwargs: [mandatory]:[string]authentication token containing user id
+        :return: ids and titles of suggested notes and status code
+        """
+        try:
+            current_user = kwargs['userid']
+            text = (request.query_params.get('q') or '').strip()
+            if len(text) < 2:
+                raise CustomError(ExceptionType.ValidationError, "Please enter at least two characters")
+            limit = request.query_params.get('limit', settings.SUGGESTION_LIMIT)
+            if not str(limit).isdigit() or int(limit) == 0:
+                raise CustomError(ExceptionType.ValidationError, "limit should be a positive integer")
+
+            suggestions = search.get_search_backend().suggest(current_user, Note.objects.visible_to(current_user).active(),
+                                                              text, min(int(limit), settings.MAX_SUGGESTION_LIMIT))
+            result = utils.manage_response(status=True, message='retrieved suggestions', data=suggestions,
+                                           log='retrieved suggested notes', logger_obj=logger)
+            return Response(result, status.HTTP_200_OK, content_type="application/json")
 
+        except CustomError as e:
+            result = utils.manage_response(status=False, message=e.message, log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
+        except Exception as e:
+            result = utils.manage_response(status=False, message='Something went wrong.Please try again.',
+                                           log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
 
 
+@method_decorator(user_login_required, name='dispatch')
+class NoteChanges(APIView):
+    """[delta sync: lists notes changed since a sync token handed out by a previous sync]
+    """
 
+    def get(self, request, **kwargs):
+        """[returns changed notes and ids of notes deleted, trashed or unshared since the token.
+            Without token every visible note is returned, paged in ascending id order. The sequence is captured by
+            the first page and carried in the continuation token, so changes made while paging are delivered by
+            the delta sync that follows]
+
+        :param request: [optional]:[string]since: token returned as next by previous sync
+                        [optional]:[int]limit: number of notes or changes per response
+                        [optional]:[boolean]expand
+        :param kwargs: [mandatory]:[string]authentication token containing user id
+        :return: changed notes, deleted note ids, has_more flag, next token and status code
+        """
+        try:
+            current_user = kwargs['userid']
+            since, after_id = sync.decode_position(request.query_params.get('since'))
+            limit = NoteCursorPagination.get_limit(request.query_params.get('limit'))
+            expand = is_expanded(request)
+            notes = Note.objects.visible_to(current_user).active().order_by('id')
+            if since is not None and since > sync.current_seq(current_user):
+                raise CustomError(ExceptionType.ValidationError, "Invalid sync token")
+
+            if since is None or after_id is not None:
+                seq = sync.current_seq(current_user) if since is None else since
+                rows = list(FastNoteSerializer.values(notes.filter(id__gt=after_id or 0), expand)[:limit + 1])
+                changes, has_more = [], len(rows) > limit
+                rows = rows[:limit]
+                next_token = sync.encode_token(seq, rows[-1]['id'] if has_more else None)
+            else:
+                changes, has_more = sync.changes_since(current_user, since, limit)
+                rows = list(FastNoteSerializer.values(
+                    notes.filter(id__in=[change.note_id for change in changes if not change.deleted]), expand))
+                next_token = sync.encode_token(changes[-1].seq if changes else since)
+
+            changed = FastNoteSerializer(rows, expand).data
+            present = {note['id'] for note in changed}
+            deleted = [change.note_id for change in changes if change.note_id not in present]
+            result = utils.manage_response(status=True, message='retrieved changes',
+                                           data={'changed': changed, 'deleted': deleted, 'has_more': has_more},
+                                           next=next_token, log='retrieved note changes', logger_obj=logger)
+            return Response(result, status.HTTP_200_OK, content_type="application/json")
 
+        except CustomError as e:
+            result = utils.manage_response(status=False, message=e.message, log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
+        except Exception as e:
+            result = utils.manage_response(status=False, message='Something went wrong.Please try again.',
+                                           log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
 
 
+@method_decorator(user_login_required, name='dispatch')
+class BatchNotes(APIView):
+    """[applies many note operations of the requesting user in one request]
+    """
 
+    def post(self, request, **kwargs):
+        """[validates all operations together and applies them in one transaction, all or nothing]
 
+        :param request: [mandatory]:[list]operations: dictionaries with op (create/update/delete),
+                        id of the note for update and delete, data with note fields for create and update
+                        (collaborators as emails, labels as names)
+        :param kwargs: [mandatory]:[string]authentication token containing user id
+        :return: per operation results with id and details of created/updated notes and status code
+        """
+        try:
+            current_user = kwargs['userid']
+            applied, results = NoteBatch(current_user, request.data.get('operations')).apply()
+            if not applied:
+                result = utils.manage_response(status=False, message='batch contains invalid operations',
+                                               log='rejected note batch', logger_obj=logger)
+                result['data'] = results
+                return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
+
+            result = utils.manage_response(status=True, message='batch applied successfully', data=results,
+                                           log='applied batch of {} note operations'.format(len(results)),
+                                           logger_obj=logger)
+            return Response(result, status.HTTP_200_OK, content_type="application/json")
 
+        except CustomError as e:
+            result = utils.manage_response(status=False, message=e.message, log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
+        except Exception as e:
+            result = utils.manage_response(status=False, message='Something went wrong.Please try again.',
+                                           log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
 
 
+@method_decorator(user_login_required, name='dispatch')
+class BulkNoteState(APIView):
+    """[pins, unpins, archives, unarchives, trashes or restores many notes of the requesting user at once]
+    """
 
+    def post(self, request, action, **kwargs):
+        """[applies state change to all given notes with a single update]
 
+        :param request: [mandatory]:[list]ids: ids of notes to be changed
+        :param action: [mandatory]:[string]pin, unpin, archive, unarchive, trash or restore
+        :param kwargs: [mandatory]:[string]authentication token containing user id
+        :return: ids of updated, unchanged and skipped notes and status code
+        """
+        try:
+            current_user = kwargs['userid']
+            outcome = transition_notes(current_user, action, request.data.get('ids'))
+            result = utils.manage_response(status=True, message='{} applied to {} notes'.format(
+                                               action, len(outcome['updated'])), data=outcome,
+                                           log='bulk {} of notes {}'.format(action, outcome['updated']),
+                                           logger_obj=logger)
+            return Response(result, status.HTTP_200_OK, content_type="application/json")
 
-
-
-
-
-
-
+        except CustomError as e:
+            result = utils.manage_response(status=False, message=e.message, log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
+        except Exception as e:
+            result = utils.manage_response(status=False, message='Something went wrong.Please try again.',
+                                           log=str(e), logger_obj=logger)
+            return Response(result, status.HTTP_400_BAD_REQUEST, content_type="application/json")
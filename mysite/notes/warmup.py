@@ -0,0 +1,78 @@
+"""
+Overview: contains cache warm-up of the first screen a user sees after logging in, bounded by a query budget
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import logging
+from django.db import connection
+from django.http import HttpRequest
+from django.urls import reverse
+from rest_framework.request import Request
+from .query import NoteQuery
+from . import generations, utils, views
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudget:
+    """[context manager failing any query beyond a fixed number, so a warm-up never costs more than its budget]
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.used >= self.limit:
+            raise QueryBudgetExceeded('query budget of {} exhausted'.format(self.limit))
+        self.used += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.wrapper = connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.wrapper.__exit__(*exc_info)
+
+
+def listing_request(url_name):
+    """[builds a request for the first page of a note listing, as the client sends it right after login]
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse(url_name)
+    return Request(request)
+
+
+def warm_note_page(user_id, url_name, generation, **presets):
+    request = listing_request(url_name)
+    key = generations.collection_cache_key(request, generations.NOTES, user_id, generation)
+    views.get_cached_page(key, lambda: views.note_page(request, NoteQuery(user_id, request.query_params,
+                                                                          **presets).queryset()))
+
+
+def warm_user_cache(user_id, budget):
+    """[caches label map, first page of notes and first page of pinned notes of the user, cheapest first,
+        stopping once budget queries were made. Records already cached cost no query]
+
+    :param user_id: [mandatory]:[int]id of the user who logged in
+    :param budget: [mandatory]:[int]maximum number of queries
+    :return: number of queries made
+    """
+    with QueryBudget(budget) as queries:
+        try:
+            utils.get_label_ids(user_id)
+            generation = generations.get_generation(generations.NOTES, user_id)
+            if generation is not None:
+                warm_note_page(user_id, 'manage-notes', generation)
+                warm_note_page(user_id, 'pinned-notes', generation, pinned=True)
+        except QueryBudgetExceeded as e:
+            logger.warning('stopped warming cache of user {}: {}'.format(user_id, e))
+    return queries.used
@@ -1,13 +1,137 @@
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
 import redis
 from decouple import config
+from services.codec import Codec
+
+
+class LocalCache:
+    """
+    In-process LRU cache bounded by number of entries and bytes, whose entries expire after a short timeout
+    """
+
+    def __init__(self,max_entries,max_bytes,timeout):
+        """[initializes an empty local cache]
+
+        :param max_entries: maximum number of entries kept
+        :param max_bytes: maximum total size of values kept
+        :param timeout: seconds an entry is served for, bounding staleness if an invalidation is missed
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.entries = OrderedDict()                     # key: (expiry time, size, value), least recent first
+        self.size = 0
+        self.generation = 0                              # bumped on every invalidation
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def sizeof(value):
+        return len(value) if isinstance(value,(bytes,str)) else sys.getsizeof(value)
+
+    def get(self,key):
+        """[gets value of a fresh entry, marking it as most recently used]
+
+        :return: value or None if key is not cached or expired
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def set(self,key,value,generation=None):
+        """[caches value, evicting least recently used entries beyond the bounds]
+
+        :param generation: [optional]:generation read before value was fetched, value is dropped if an
+                           invalidation happened meanwhile as it may be stale
+        :return: -
+        """
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.remove(key)
+            self.entries[key] = (time.monotonic() + self.timeout, size, value)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self,key):
+        entry = self.entries.pop(key,None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def invalidate(self,keys):
+        """[drops entries of keys changed by this or another process]
+        """
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                self.remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.size = 0
 
 
 class Cache:
     """
-    Instantiates cache object and returns same instance for further operations using getInstance()
+    Instantiates cache object and returns same instance for further operations using getInstance().
+    Values are stored through Codec, so they are read back with the structure they were written with.
+    Records can be tagged, e.g. with the note they were derived from, to invalidate all of them at once.
+    Optionally keeps recently read records in an in-process LRU (L1) in front of redis (L2). Every write or
+    delete is published on a redis channel, so each process drops changed keys from its L1
     """
 
     __shared_instance = None
+    INVALIDATION_CHANNEL = 'CACHE_INVALIDATIONS'
+    RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    ADD_TO_TAG = """
+        redis.call('sadd', KEYS[1], ARGV[1])
+        if redis.call('ttl', KEYS[1]) < tonumber(ARGV[2]) then redis.call('expire', KEYS[1], ARGV[2]) end
+    """
+    INVALIDATE_TAGS = """
+        local invalidated = {}
+        local count = #KEYS / 2
+        for i = 1, count do
+            for _, key in ipairs(redis.call('smembers', KEYS[i])) do
+                redis.call('del', ARGV[1] .. key)
+                table.insert(invalidated, key)
+            end
+            redis.call('del', KEYS[i])
+            redis.call('incr', KEYS[count + i])
+            redis.call('expire', KEYS[count + i], ARGV[2])
+        end
+        return invalidated
+    """
+    SET_UNLESS_INVALIDATED = """
+        local count = (#KEYS - 1) / 2
+        for i = 1, count do
+            if (redis.call('get', KEYS[1 + count + i]) or '') ~= ARGV[3 + i] then return 0 end
+        end
+        redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+        for i = 1, count do
+            redis.call('sadd', KEYS[1 + i], ARGV[3])
+            if redis.call('ttl', KEYS[1 + i]) < tonumber(ARGV[2]) then redis.call('expire', KEYS[1 + i], ARGV[2]) end
+        end
+        return 1
+    """
+    VERSION_TIMEOUT = 60*60                              # tag versions only need to outlive a computation
 
     @staticmethod
     def getInstance():
@@ -16,35 +140,160 @@ class Cache:
         """
 
         if Cache.__shared_instance == None:
-            Cache.__shared_instance = Cache(config('REDIS_HOST'),config('REDIS_PORT'))
+            local = None
+            if config('CACHE_L1_ENABLED',default=False,cast=bool):
+                local = LocalCache(config('CACHE_L1_MAX_ENTRIES',default=10000,cast=int),
+                                   config('CACHE_L1_MAX_BYTES',default=16*1024*1024,cast=int),
+                                   config('CACHE_L1_TIMEOUT',default=30,cast=int))
+            Cache.__shared_instance = Cache(config('REDIS_HOST'),config('REDIS_PORT'),
+                                            prefix=config('CACHE_KEY_PREFIX',default=''),
+                                            default_timeout=config('CACHE_DEFAULT_TIMEOUT',default=60*60*5,cast=int),
+                                            local=local,
+                                            codec=Codec(config('CACHE_COMPRESS_THRESHOLD',default=1024,cast=int),
+                                                        config('CACHE_USE_MSGPACK',default=True,cast=bool)))
         return Cache.__shared_instance
 
-    def __init__(self,host,port):
+    def __init__(self,host,port,prefix='',default_timeout=60*60*5,local=None,codec=None):
         """[initializes a cache instance with host and port]
 
         :param host: host to be set for redis
         :param port: port number to be set for redis
+        :param prefix: namespace prepended to every key, e.g. per deployment
+        :param default_timeout: seconds after which records expire unless another timeout is given
+        :param local: LocalCache used as L1, None to always read from redis
+        :param codec: Codec encoding values, default Codec() if not given
         """
 
         self.cache = redis.StrictRedis(host=host,port=port)
+        self.prefix = prefix
+        self.default_timeout = default_timeout
+        self.local = local
+        self.codec = codec or Codec()
+        self.origin = uuid.uuid4().hex
+        self.subscriber_pid = None
+        self.subscriber = None                           # thread listening to invalidations
+        self.subscriber_lock = threading.Lock()
+        self.counters = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0}
+
+    def make_key(self,key):
+        """[namespaces key with configured prefix, to be used by code talking to redis directly]
 
-    def set(self,key,value):
-        """[sets new key value pair in cache]
+        :param key: [mandatory]:[string]:key without prefix
+        :return: key as stored in redis
+        """
+        return self.prefix + ':' + key if self.prefix else key
+
+    def subscribe(self):
+        """[starts listening to invalidations of other processes, once per process since worker processes
+            forked after the cache was created do not inherit the listening thread, and again when the
+            thread died on a redis error, as L1 may have missed invalidations meanwhile it is cleared]
+        """
+        if self.listening():
+            return
+        with self.subscriber_lock:
+            if self.listening():
+                return
+            if self.subscriber_pid == os.getpid():
+                self.subscriber.pubsub.close()
+            self.local.clear()
+            self.origin = uuid.uuid4().hex
+            pubsub = self.cache.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.make_key(self.INVALIDATION_CHANNEL): self.on_invalidation})
+            self.subscriber = pubsub.run_in_thread(sleep_time=1,daemon=True)
+            self.subscriber_pid = os.getpid()
+
+    def listening(self):
+        return self.subscriber_pid == os.getpid() and self.subscriber.is_alive()
+
+    def on_invalidation(self,message):
+        origin, _, keys = message['data'].decode('utf-8').partition('\n')
+        if origin != self.origin:
+            self.local.invalidate(keys.split('\n'))
+
+    def invalidate(self,keys):
+        """[drops keys from L1 of this process and publishes them to every other process]
+        """
+        if self.local is not None and keys:
+            self.subscribe()
+            self.local.invalidate(keys)
+            self.cache.publish(self.make_key(self.INVALIDATION_CHANNEL),self.origin + '\n' + '\n'.join(keys))
+
+    def count(self,tier,hits,misses):
+        self.counters[tier + '_hits'] += hits
+        self.counters[tier + '_misses'] += misses
+
+    def stats(self):
+        """[reports hits and misses of both tiers since process start]
+
+        :return: dictionary of counters, with number of entries and bytes held by L1
+        """
+        stats = dict(self.counters)
+        if self.local is not None:
+            stats.update(l1_entries=len(self.local.entries),l1_bytes=self.local.size)
+        return stats
+
+    def tag_key(self,tag):
+        return self.make_key('TAG_' + tag)
+
+    def version_key(self,tag):
+        return self.make_key('TAG_VERSION_' + tag)
+
+    def tag_versions(self,tags):
+        """[reads how many times each tag was invalidated lately, to be passed to set once value is computed]
+
+        :param tags: [mandatory]:[list]:tags the value will be set with
+        :return: list of versions, in order of tags
+        """
+        return [(version or b'').decode('utf-8') for version in self.cache.mget([self.version_key(tag) for tag in tags])]
+
+    def set(self,key,value,timeout=None,tags=None,versions=None):
+        """[sets new key value pair in cache together with its expiry]
 
         :param key: [mandatory]:[string]:the key to be used for token/note record
-        :param value: [mandatory]:[string]:the value to be used for token/note record
+        :param value: [mandatory]:the value to be used for token/note record, any json serializable value
+        :param timeout: [optional]:[int]:seconds until record expires, default_timeout if not given
+        :param tags: [optional]:[list]:tags record is invalidated with by invalidate_tags
+        :param versions: [optional]:[list]:tag_versions read before value was computed, value is dropped if
+                         any tag was invalidated meanwhile as it may be stale
+        :return: True if value was set
+        """
+        timeout = timeout or self.default_timeout
+        if tags and versions is not None:
+            tags = list(tags)
+            keys = [self.tag_key(tag) for tag in tags] + [self.version_key(tag) for tag in tags]
+            if not self.cache.eval(self.SET_UNLESS_INVALIDATED,len(keys) + 1,self.make_key(key),*keys,
+                                   self.codec.encode(value),timeout,key,*versions):
+                return False
+            self.invalidate([key])
+            return True
+        pipeline = self.cache.pipeline(transaction=False)
+        pipeline.set(self.make_key(key),self.codec.encode(value),ex=timeout)
+        for tag in tags or []:
+            pipeline.eval(self.ADD_TO_TAG,1,self.tag_key(tag),key,timeout)
+        pipeline.execute()
+        self.invalidate([key])
+        return True
+
+    def invalidate_tags(self,tags):
+        """[deletes every record tagged with any of the tags, in one round trip]
+
+        :param tags: [mandatory]:[list]:tags given when records were set
         :return: -
         """
-        self.cache.set(key,value)
-        self.cache.expire(key,time=60*60*5)
+        tags = list(tags)
+        if tags:
+            prefix = self.make_key('')
+            keys = self.cache.eval(self.INVALIDATE_TAGS,2 * len(tags),*[self.tag_key(tag) for tag in tags],
+                                   *[self.version_key(tag) for tag in tags],prefix,self.VERSION_TIMEOUT)
+            self.invalidate([key.decode('utf-8') for key in keys])
 
     def get(self,key):
         """[gets value for existing key in cache]
 
         :param key: [mandatory]:[string]:the key to be used for existing token/note record
-        :return: value stored against key
+        :return: value stored against key, None if missing
         """
-        return  self.cache.get(key)
+        return self.get_many([key]).get(key)
 
     def delete(self,key):
         """[deletes cache record for existing key in cache]
@@ -52,16 +301,128 @@ class Cache:
         :param key: [mandatory]:[string]:the key to be used for existing token/note record
         :return: -
         """
-        self.cache.delete(key)
+        self.cache.delete(self.make_key(key))
+        self.invalidate([key])
 
+    def get_many(self,keys):
+        """[gets values of many keys, from L1 when enabled and from redis in one round trip for the rest]
 
+        :param keys: [mandatory]:[list]:keys of token/note records
+        :return: dictionary of keys found in cache and their decoded values
+        """
+        keys = list(keys)
+        found = {}
+        if self.local is not None:
+            self.subscribe()
+            for key in keys:
+                data = self.local.get(key)
+                if data is not None:
+                    found[key] = data
+            self.count('l1',len(found),len(keys) - len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            generation = self.local.generation if self.local is not None else None
+            values = self.cache.mget([self.make_key(key) for key in missing])
+            for key, data in zip(missing, values):
+                if data is not None:
+                    found[key] = data
+                    if self.local is not None:
+                        self.local.set(key,data,generation)
+            self.count('l2',sum(data is not None for data in values),sum(data is None for data in values))
+        decoded = {key: self.codec.decode(data) for key, data in found.items()}
+        return {key: value for key, value in decoded.items() if value is not None}
 
+    def set_many(self,records,timeout=None,timeouts=None):
+        """[sets many key value pairs with their expiry in one round trip]
 
+        :param records: [mandatory]:[dict]:keys and json serializable values of token/note records
+        :param timeout: [optional]:[int]:seconds until records expire, default_timeout if not given
+        :param timeouts: [optional]:[dict]:seconds until expiry of specific keys, overriding timeout
+        :return: -
+        """
+        if records:
+            timeouts = timeouts or {}
+            pipeline = self.cache.pipeline(transaction=False)
+            for key, value in records.items():
+                pipeline.set(self.make_key(key),self.codec.encode(value),
+                             ex=timeouts.get(key) or timeout or self.default_timeout)
+            pipeline.execute()
+            self.invalidate(list(records))
 
+    def delete_many(self,keys):
+        """[deletes cache records of all keys in one round trip]
 
+        :param keys: [mandatory]:[list]:keys of token/note records to be deleted
+        :return: -
+        """
+        keys = list(keys)
+        if keys:
+            self.cache.delete(*[self.make_key(key) for key in keys])
+            self.invalidate(keys)
+
+    def set_computed(self,key,value,timeout=None,delta=0,tags=None,versions=None):
+        """[sets value read back by get_or_set, together with its logical expiry and time taken to compute it.
+            The record outlives its logical expiry by a grace period in which it is still served as stale]
 
+        :param key: [mandatory]:[string]:the key to be used for the record
+        :param value: [mandatory]:json serializable value
+        :param timeout: [optional]:[int]:seconds until value is due for recomputation, default_timeout if not given
+        :param delta: [optional]:[float]:seconds taken to compute value
+        :param tags: [optional]:[list]:tags record is invalidated with by invalidate_tags
+        :param versions: [optional]:[list]:tag_versions read before value was computed
+        :return: True if value was set
+        """
+        timeout = timeout or self.default_timeout
+        return self.set(key,{'value': value, 'delta': delta, 'expiry': time.time() + timeout},
+                        timeout=timeout + self.stale_timeout(timeout),tags=tags,versions=versions)
 
+    @staticmethod
+    def stale_timeout(timeout):
+        return max(10,timeout // 10)
 
+    def get_or_set(self,key,compute,timeout=None,beta=1.0,lock_timeout=10,wait=2,tags=None):
+        """[reads value of key, computing and caching it when missing or due. Only one worker recomputes a key
+            at a time, holding a short redis lock, while others serve the stale value or wait for the new one.
+            Each read may also recompute a little before expiry, more likely the closer expiry is and the longer
+            the value took to compute (XFetch), so hot keys are refreshed before every reader misses at once.
+            A value whose tags are invalidated while it is computed is returned but not cached, as it may be stale]
 
+        :param key: [mandatory]:[string]:the key to be used for the record
+        :param compute: [mandatory]:function returning the json serializable value when called without arguments
+        :param timeout: [optional]:[int]:seconds until value is due for recomputation, default_timeout if not given
+        :param beta: [optional]:[float]:eagerness of early recomputation, 0 to only recompute on expiry
+        :param lock_timeout: [optional]:[int]:seconds after which the lock of a crashed worker is released
+        :param wait: [optional]:[float]:seconds to wait for another worker's value before computing it as well
+        :param tags: [optional]:[list]:tags record is invalidated with by invalidate_tags
+        :return: cached or computed value
+        """
+        entry = self.get(key)
+        if not self.is_computed(entry):
+            entry = None
+        elif time.time() - entry['delta'] * beta * math.log(1.0 - random.random()) < entry['expiry']:
+            return entry['value']
+        lock_key = self.make_key(key + '_LOCK')
+        token = uuid.uuid4().hex
+        if self.cache.set(lock_key,token,nx=True,ex=lock_timeout):
+            try:
+                versions = self.tag_versions(tags) if tags else None
+                start = time.perf_counter()
+                value = compute()
+                self.set_computed(key,value,timeout,time.perf_counter() - start,tags,versions)
+                return value
+            finally:
+                self.cache.eval(self.RELEASE_LOCK,1,lock_key,token)
+        if entry is not None:
+            return entry['value']
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.get(key)
+            if self.is_computed(entry):
+                return entry['value']
+        return compute()
 
+    @staticmethod
+    def is_computed(entry):
+        return isinstance(entry,dict) and entry.keys() == {'value','delta','expiry'}
 
@@ -0,0 +1,77 @@
+"""
+Overview: contains codec turning cached values into compact bytes and back into the exact same structure
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import zlib
+from rest_framework.utils.encoders import JSONEncoder
+from services.renderers import dumps, loads
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+VERSION = 1                                      # schema version, bump to make every previously cached value a miss
+COMPRESSED = 0x01
+MSGPACK = 0x02
+encoder = JSONEncoder()
+
+
+class Codec:
+    """[encodes values as a header byte followed by msgpack (or compact json when msgpack is not installed),
+        zlib compressed above a size threshold. The header holds the schema version in its high nibble and
+        format flags in its low nibble, so it is always a control character and never the first byte of
+        values cached as plain text before the codec existed, which are passed through as raw bytes]
+    """
+
+    def __init__(self, compress_threshold=1024, use_msgpack=True):
+        """[initializes codec]
+
+        :param compress_threshold: values whose encoding is longer are compressed if that makes them smaller
+        :param use_msgpack: False to encode with json even if msgpack is installed
+        """
+        self.compress_threshold = compress_threshold
+        self.use_msgpack = use_msgpack and msgpack is not None
+
+    def encode(self, value):
+        """[encodes value for storage]
+
+        :param value: [mandatory]:json serializable value, e.g. serializer data
+        :return: bytes
+        """
+        flags = 0
+        if self.use_msgpack:
+            payload = msgpack.packb(value, default=encoder.default, use_bin_type=True)
+            flags |= MSGPACK
+        else:
+            payload = dumps(value)
+        if len(payload) > self.compress_threshold:
+            compressed = zlib.compress(payload)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= COMPRESSED
+        return bytes([VERSION << 4 | flags]) + payload
+
+    @staticmethod
+    def decode(data):
+        """[decodes stored bytes]
+
+        :param data: [mandatory]:[bytes]value read from cache
+        :return: decoded value, raw bytes for values cached before the codec existed,
+                 None for values of another schema version
+        """
+        if data is None or not data or data[0] >= 0x20:
+            return data
+        header = data[0]
+        if header >> 4 != VERSION:
+            return None
+        payload = data[1:]
+        if header & COMPRESSED:
+            payload = zlib.decompress(payload)
+        if header & MSGPACK:
+            if msgpack is None:
+                return None
+            return msgpack.unpackb(payload, raw=False)
+        return loads(payload)
@@ -0,0 +1,71 @@
+"""
+Overview: contains json renderer and parser used by all apis, backed by orjson when it is installed
+Author: Anam Fazal
+Created on: Oct 18, 2026
+"""
+
+import json
+from django.conf import settings
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+encoder = JSONEncoder()
+
+
+def dumps(data):
+    """[serializes data to compact utf-8 json. Datetimes, uuids and strings (colors included) are
+        handled natively by orjson, remaining types (lazy strings, decimals, querysets...) like DRF does]
+
+    :param data: [mandatory]:data to be serialized
+    :return: json bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=encoder.default, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(content):
+    """[parses json bytes or string]
+
+    :param content: [mandatory]:[bytes/string]json document
+    :return: parsed data
+    :raises ValueError: if content is not valid json
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """[renders api responses with dumps, falling back to DRF renderer when indented output is requested]
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(parsers.JSONParser):
+    """[parses json request bodies with loads]
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return loads(content)
+        except ValueError as e:
+            raise ParseError('JSON parse error - {}'.format(e))
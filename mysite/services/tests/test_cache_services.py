@@ -0,0 +1,160 @@
+import time
+import uuid
+import pytest
+from decouple import config
+from services.cache import Cache, LocalCache
+
+
+def redis_cache(prefix, local=None):
+    return Cache(config('REDIS_HOST'), config('REDIS_PORT'), prefix=prefix, default_timeout=60, local=local)
+
+
+@pytest.fixture
+def cache():
+    cache = redis_cache('test-' + uuid.uuid4().hex)
+    yield cache
+    keys = cache.cache.keys(cache.make_key('*'))
+    if keys:
+        cache.cache.delete(*keys)
+
+
+class TestCacheKeys:
+    def test_many_records_round_trip(self, cache):
+        cache.set_many({'first': 1, 'second': {'ids': [1, 2]}}, timeouts={'second': 5})
+        assert cache.get_many(['first', 'second', 'missing']) == {'first': 1, 'second': {'ids': [1, 2]}}
+        assert 5 < cache.cache.ttl(cache.make_key('first')) <= 60
+        assert 0 < cache.cache.ttl(cache.make_key('second')) <= 5
+
+        cache.delete_many(['first', 'second'])
+        assert cache.get_many(['first', 'second']) == {}
+
+    def test_timeout_applies_to_records_without_their_own(self, cache):
+        cache.set_many({'first': 1, 'second': 2}, timeout=10, timeouts={'second': 5})
+        assert 5 < cache.cache.ttl(cache.make_key('first')) <= 10
+        assert 0 < cache.cache.ttl(cache.make_key('second')) <= 5
+
+    def test_keys_are_prefixed(self, cache):
+        cache.set('note', 'value')
+        assert cache.make_key('note') == cache.prefix + ':note'
+        assert cache.cache.exists(cache.prefix + ':note')
+        assert not cache.cache.exists('note')
+        assert cache.get('note') == 'value'
+        assert redis_cache('other-' + cache.prefix).get('note') is None
+
+
+class TestComputedRecords:
+    def test_value_computed_while_its_tags_are_invalidated_is_not_cached(self, cache):
+        def compute():
+            cache.invalidate_tags(['NOTE_1'])
+            return 'stale'
+        assert cache.get_or_set('detail', compute, tags=['NOTE_1', 'NOTE_2']) == 'stale'
+        assert cache.get('detail') is None
+
+        assert cache.get_or_set('detail', lambda: 'fresh', tags=['NOTE_1', 'NOTE_2']) == 'fresh'
+        assert cache.get_or_set('detail', lambda: 'recomputed', tags=['NOTE_1', 'NOTE_2']) == 'fresh'
+        cache.invalidate_tags(['NOTE_2'])
+        assert cache.get('detail') is None
+
+    def test_versions_read_before_invalidation_are_rejected(self, cache):
+        versions = cache.tag_versions(['NOTE_1'])
+        cache.invalidate_tags(['NOTE_1'])
+        assert not cache.set_computed('detail', 'stale', tags=['NOTE_1'], versions=versions)
+        assert cache.set_computed('detail', 'fresh', tags=['NOTE_1'], versions=cache.tag_versions(['NOTE_1']))
+        assert cache.get('detail')['value'] == 'fresh'
+
+
+class TestLocalCache:
+    def test_least_recently_used_entries_are_evicted(self):
+        local = LocalCache(max_entries=2, max_bytes=1024, timeout=30)
+        local.set('first', b'1')
+        local.set('second', b'2')
+        assert local.get('first') == b'1'
+        local.set('third', b'3')
+        assert local.get('second') is None
+        assert local.get('first') == b'1'
+        assert local.get('third') == b'3'
+
+    def test_entries_are_bounded_by_bytes(self):
+        local = LocalCache(max_entries=10, max_bytes=10, timeout=30)
+        local.set('first', b'12345')
+        local.set('second', b'12345')
+        local.set('third', b'123')
+        assert local.get('first') is None
+        assert local.size == 8
+        local.set('large', b'12345678901')
+        assert local.get('large') is None
+        assert local.get('second') == b'12345'
+
+    def test_entries_expire(self, monkeypatch):
+        local = LocalCache(max_entries=10, max_bytes=1024, timeout=30)
+        local.set('note', b'value')
+        now = time.monotonic()
+        monkeypatch.setattr(time, 'monotonic', lambda: now + 31)
+        assert local.get('note') is None
+        assert local.size == 0
+
+    def test_value_read_before_invalidation_is_dropped(self):
+        local = LocalCache(max_entries=10, max_bytes=1024, timeout=30)
+        generation = local.generation
+        local.invalidate(['note'])
+        local.set('note', b'stale', generation)
+        assert local.get('note') is None
+        local.set('note', b'fresh', local.generation)
+        assert local.get('note') == b'fresh'
+
+    def test_invalidation_drops_keys(self):
+        local = LocalCache(max_entries=10, max_bytes=1024, timeout=30)
+        local.set('first', b'1')
+        local.set('second', b'2')
+        local.invalidate(['first', 'missing'])
+        assert local.get('first') is None
+        assert local.get('second') == b'2'
+        local.clear()
+        assert local.get('second') is None
+        assert local.size == 0
+
+
+@pytest.fixture
+def layered_cache(cache):
+    layered = redis_cache(cache.prefix, local=LocalCache(max_entries=10, max_bytes=1024, timeout=30))
+    yield layered
+    if layered.subscriber is not None:
+        layered.subscriber.stop()
+
+
+class TestLayeredCache:
+    def test_stats_count_hits_and_misses_of_both_tiers(self, cache, layered_cache):
+        cache.set('note', 'value')
+        assert layered_cache.get_many(['note', 'missing']) == {'note': 'value'}
+        assert layered_cache.get('note') == 'value'
+        stats = layered_cache.stats()
+        assert (stats['l1_hits'], stats['l1_misses']) == (1, 2)
+        assert (stats['l2_hits'], stats['l2_misses']) == (1, 1)
+        assert stats['l1_entries'] == 1
+        assert stats['l1_bytes'] == layered_cache.local.size > 0
+
+    def test_write_of_another_process_invalidates_local_copy(self, layered_cache):
+        other = redis_cache(layered_cache.prefix, local=LocalCache(max_entries=10, max_bytes=1024, timeout=30))
+        try:
+            other.set('note', 'old')
+            assert layered_cache.get('note') == 'old'
+            other.set('note', 'new')
+            deadline = time.monotonic() + 5
+            while layered_cache.local.get('note') is not None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert layered_cache.get('note') == 'new'
+        finally:
+            other.subscriber.stop()
+
+    def test_dead_listener_is_restarted_and_local_copies_dropped(self, layered_cache):
+        layered_cache.set('note', 'value')
+        assert layered_cache.get('note') == 'value'
+        dead = layered_cache.subscriber
+        dead.stop()
+        dead.join(5)
+
+        assert layered_cache.local.get('note') == layered_cache.codec.encode('value')
+        layered_cache.get_many([])
+        assert layered_cache.subscriber is not dead
+        assert layered_cache.subscriber.is_alive()
+        assert layered_cache.local.get('note') is None